@@ -5,84 +5,216 @@ from src.academic_metadata import (
     AcademicMetadata, Author, Reference, Citation
 )
 from src.equation_metadata import Equation
-import json
 from termcolor import colored
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import networkx as nx
 import pyvis
 from pyvis.network import Network
-import tempfile
 
-def show_academic():
-    st.divider()
-    st.write("### 📚 Academic Analysis")
+
+def _metadata_signature(store_path: Path) -> tuple:
+    """Name, mtime and size of each metadata file; changes whenever a file is written"""
+    return tuple(sorted(
+        (file.name, stat.st_mtime_ns, stat.st_size)
+        for file in store_path.glob("*_metadata.json")
+        for stat in (file.stat(),)
+    ))
+
+
+def _read_metadata_file(file: Path) -> AcademicMetadata:
+    """Read and parse one metadata file"""
+    # Decode and validate in one step inside pydantic-core, straight from the raw bytes
+    return AcademicMetadata.model_validate_json(file.read_bytes())
+
+
+# cache_resource hands back the parsed models without copying them on every hit,
+# so callers must treat the list as read-only. A few stores' worth is kept.
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_metadata(store_str: str, signature: tuple) -> tuple[list[AcademicMetadata], list[str]]:
+    """Parse a store's metadata files once per signature, returning models and load errors"""
+    files = [Path(store_str) / name for name, _, _ in signature]
+    if not files:
+        return [], []
     
-    def load_metadata_files(store_path: Path) -> list[AcademicMetadata]:
-        """Load all metadata files from the store"""
-        metadata_files = list(store_path.glob("*_metadata.json"))
-        metadata_list = []
-        
-        for file in metadata_files:
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    metadata = AcademicMetadata.from_dict(data)
-                    metadata_list.append(metadata)
-            except Exception as e:
-                st.error(f"Error loading {file.name}: {str(e)}")
-        
-        return metadata_list
+    # Files are independent, so read and parse them concurrently
+    with ThreadPoolExecutor(max_workers=min(32, len(files))) as executor:
+        futures = [executor.submit(_read_metadata_file, file) for file in files]
+    
+    metadata_list = []
+    errors = []
+    for file, future in zip(files, futures):
+        try:
+            metadata_list.append(future.result())
+        except Exception as e:
+            errors.append(f"Error loading {file.name}: {str(e)}")
+    
+    return metadata_list, errors
 
-    def create_citation_network(metadata_list: list[AcademicMetadata]) -> Network:
-        """Create citation network visualization"""
-        G = nx.DiGraph()
-        
-        # Add nodes and edges
-        for doc in metadata_list:
-            # Add document as node
-            G.add_node(doc.doc_id, title=doc.title, type="document")
-            
-            # Add references and citations
-            for ref in doc.references:
-                ref_id = f"{ref.title}_{ref.year}" if ref.title and ref.year else str(ref)
-                G.add_node(ref_id, title=ref.title or "Unknown", type="reference")
-                G.add_edge(doc.doc_id, ref_id)
-        
-        # Create PyVis network
-        net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white")
-        
-        # Add nodes with different colors for documents and references
-        for node in G.nodes(data=True):
-            net.add_node(
-                node[0],
-                label=node[1]["title"][:30] + "..." if len(node[1]["title"]) > 30 else node[1]["title"],
-                color="#00ff00" if node[1]["type"] == "document" else "#ff9999"
-            )
-        
-        # Add edges
-        for edge in G.edges():
-            net.add_edge(edge[0], edge[1])
+
+def create_citation_network(
+    metadata_list: list[AcademicMetadata], min_citations: int = 1, physics: bool = False
+) -> Network:
+    """Create citation network visualization, hiding references cited fewer than min_citations times
+
+    With physics off the layout is computed here and drawn statically; with it on
+    the browser runs a short, capped simulation so nodes can be dragged around.
+    """
+    # Collect nodes and edges in one pass; no graph algorithm runs here, so
+    # there is no need for an intermediate NetworkX graph
+    nodes = {}  # node id -> (title, color)
+    edges = {}  # ordered set of (source, target)
+    for doc in metadata_list:
+        # Documents and references get different colors
+        nodes[doc.doc_id] = (doc.title, "#00ff00")
         
+        # Add references and citations; a DOI identifies a work even when its
+        # title is formatted differently across papers
+        for ref in doc.references:
+            ref_id = ref.doi or (f"{ref.title}_{ref.year}" if ref.title and ref.year else str(ref))
+            # Works cited by several papers are added once
+            if ref_id not in nodes:
+                nodes[ref_id] = (ref.title or "Unknown", "#ff9999")
+            edges[(doc.doc_id, ref_id)] = None
+    
+    # Prune rarely cited references before layout and rendering; documents always stay
+    if min_citations > 1:
+        citation_counts = Counter(target for _, target in edges)
+        doc_ids = {doc.doc_id for doc in metadata_list}
+        nodes = {
+            node: attrs for node, attrs in nodes.items()
+            if node in doc_ids or citation_counts[node] >= min_citations
+        }
+        edges = {edge: None for edge in edges if edge[1] in nodes}
+    
+    # Create PyVis network
+    # vis.js is loaded from the CDN rather than bundled into every page
+    net = Network(
+        height="600px", width="100%", bgcolor="#222222", font_color="white",
+        cdn_resources="remote"
+    )
+    node_attrs = {
+        "label": [title[:30] + "..." if len(title) > 30 else title for title, _ in nodes.values()],
+        "color": [color for _, color in nodes.values()],
+    }
+    if not physics:
+        # Lay the graph out once on the server; the browser then draws a static
+        # picture instead of running a physics simulation until it settles
+        layout_graph = nx.Graph()
+        layout_graph.add_nodes_from(nodes)
+        layout_graph.add_edges_from(edges)
+        pos = nx.spring_layout(layout_graph, seed=42, iterations=50, scale=1000)
+        node_attrs["x"] = [float(pos[node][0]) for node in nodes]
+        node_attrs["y"] = [float(pos[node][1]) for node in nodes]
+    net.add_nodes(list(nodes), **node_attrs)
+    
+    # Add edges
+    for source, target in edges:
+        net.add_edge(source, target)
+    
+    if physics:
+        # Barnes-Hut with a fixed stabilization budget converges in bounded time
         net.set_options("""
         var options = {
             "physics": {
-                "forceAtlas2Based": {
-                    "gravitationalConstant": -100,
-                    "centralGravity": 0.01,
-                    "springLength": 100,
-                    "springConstant": 0.08
+                "solver": "barnesHut",
+                "barnesHut": {
+                    "gravitationalConstant": -8000,
+                    "springLength": 100
+                },
+                "stabilization": {
+                    "iterations": 50,
+                    "updateInterval": 25
                 },
-                "solver": "forceAtlas2Based",
-                "minVelocity": 0.75,
-                "timestep": 0.5
+                "minVelocity": 1.0
             }
         }
         """)
+    else:
+        net.set_options("""
+        var options = {
+            "physics": {
+                "enabled": false
+            }
+        }
+        """)
+    
+    return net
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _reference_frame(store_str: str, signature: tuple) -> pd.DataFrame:
+    """One row per reference, built once per metadata signature for vectorized aggregation"""
+    metadata_list, _ = _load_metadata(store_str, signature)
+    return pd.DataFrame(
+        [
+            {
+                "doc": doc.doc_id,
+                "year": ref.year or None,
+                "authors": [author.full_name for author in ref.authors if author.full_name],
+            }
+            for doc in metadata_list
+            for ref in doc.references
+        ],
+        columns=["doc", "year", "authors"],
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _summary_counts(store_str: str, signature: tuple) -> dict[str, int]:
+    """Document, reference, citation and equation totals, computed once per metadata signature"""
+    metadata_list, _ = _load_metadata(store_str, signature)
+    return {
+        "documents": len(metadata_list),
+        "references": sum(len(doc.references) for doc in metadata_list),
+        "citations": sum(len(doc.citations) for doc in metadata_list),
+        "equations": sum(len(doc.equations) for doc in metadata_list),
+    }
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _equation_counts(store_str: str, signature: tuple) -> tuple[Counter, Counter]:
+    """Equation type and symbol counts, computed once per metadata signature"""
+    metadata_list, _ = _load_metadata(store_str, signature)
+    # Count types and symbols in one pass over the equations
+    eq_types = Counter()
+    symbols = Counter()
+    for doc in metadata_list:
+        for eq in doc.equations:
+            eq_types[eq.equation_type] += 1
+            symbols.update(eq.symbols)
+    return eq_types, symbols
+
+
+# Persisted so a rebuilt page survives app restarts; the signature changes
+# with any metadata write, which keeps stale pages from being served
+@st.cache_data(show_spinner=False, persist="disk", max_entries=16)
+def _citation_network_html(store_str: str, signature: tuple, min_citations: int, physics: bool) -> str:
+    """Citation network page for a store, rebuilt only when its metadata or display settings change"""
+    metadata_list, _ = _load_metadata(store_str, signature)
+    net = create_citation_network(metadata_list, min_citations, physics)
+    
+    # Render the page in memory; nothing needs to touch the disk
+    return net.generate_html(notebook=False)
+
+
+def show_academic():
+    st.divider()
+    st.write("### 📚 Academic Analysis")
+    
+    def load_metadata_files(store_path: Path, signature: tuple) -> list[AcademicMetadata]:
+        """Load all metadata files from the store, parsed once until a file changes
+
+        The list is shared with other sessions through the cache; don't modify it.
+        """
+        metadata_list, errors = _load_metadata(str(store_path), signature)
+        for error in errors:
+            st.error(error)
         
-        return net
+        return metadata_list
 
     def main():
         st.title("📚 Academic Analysis")
@@ -98,8 +230,8 @@ def show_academic():
             return
         
         # Load metadata
-        metadata_list = load_metadata_files(store_path)
-        if not metadata_list:
+        signature = _metadata_signature(store_path)
+        if not load_metadata_files(store_path, signature):
             st.warning("No academic metadata found in the current store")
             return
         
@@ -107,38 +239,49 @@ def show_academic():
         st.header("📊 Summary Statistics")
         col1, col2, col3, col4 = st.columns(4)
         
+        counts = _summary_counts(str(store_path), signature)
         with col1:
-            st.metric("Documents", len(metadata_list))
+            st.metric("Documents", counts["documents"])
         
-        total_refs = sum(len(doc.references) for doc in metadata_list)
         with col2:
-            st.metric("References", total_refs)
+            st.metric("References", counts["references"])
         
-        total_citations = sum(len(doc.citations) for doc in metadata_list)
         with col3:
-            st.metric("Citations", total_citations)
+            st.metric("Citations", counts["citations"])
         
-        total_equations = sum(len(doc.equations) for doc in metadata_list)
         with col4:
-            st.metric("Equations", total_equations)
+            st.metric("Equations", counts["equations"])
         
         # Citation Network
         st.header("🕸️ Citation Network")
-        net = create_citation_network(metadata_list)
-        
-        # Save and display network
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.html') as tmp:
-            net.save_graph(tmp.name)
-            with open(tmp.name, 'r', encoding='utf-8') as f:
-                html = f.read()
-            st.components.v1.html(html, height=600)
+        min_citations = st.slider(
+            "Min citations to display",
+            min_value=1,
+            max_value=10,
+            value=1,
+            help="Hide references cited by fewer papers than this to keep large networks responsive",
+        )
+        layout_mode = st.radio(
+            "Layout",
+            ["fast (static layout)", "interactive (physics)"],
+            horizontal=True,
+            help="The static layout is computed once; physics lets you drag nodes but costs browser time",
+        )
+        st.components.v1.html(
+            _citation_network_html(
+                str(store_path), signature, min_citations, layout_mode == "interactive (physics)"
+            ),
+            height=600
+        )
         
         # Reference Analysis
         st.header("📑 Reference Analysis")
         
+        refs_df = _reference_frame(str(store_path), signature)
+        
         # Year distribution
-        years = [ref.year for doc in metadata_list for ref in doc.references if ref.year]
-        if years:
+        years = refs_df["year"].dropna().astype(int)
+        if not years.empty:
             fig = px.histogram(
                 x=years,
                 title="Reference Year Distribution",
@@ -151,19 +294,13 @@ def show_academic():
         st.header("👥 Author Analysis")
         
         # Count author appearances
-        author_counts = Counter()
-        for doc in metadata_list:
-            for ref in doc.references:
-                for author in ref.authors:
-                    if author.full_name:
-                        author_counts[author.full_name] += 1
+        top_authors = refs_df["authors"].explode().dropna().value_counts().head(20)
         
         # Create author frequency chart
-        top_authors = dict(sorted(author_counts.items(), key=lambda x: x[1], reverse=True)[:20])
-        if top_authors:
+        if not top_authors.empty:
             fig = px.bar(
-                x=list(top_authors.keys()),
-                y=list(top_authors.values()),
+                x=top_authors.index,
+                y=top_authors.values,
                 title="Top 20 Most Cited Authors",
                 labels={"x": "Author", "y": "Citations"},
                 template="plotly_dark"
@@ -171,18 +308,13 @@ def show_academic():
             fig.update_layout(xaxis_tickangle=45)
             st.plotly_chart(fig, use_container_width=True)
         
-        # Equation Analysis
-        if any(doc.equations for doc in metadata_list):
+        # Equation Analysis; every equation has a type, so an empty type count
+        # means there are no equations
+        eq_types, symbols = _equation_counts(str(store_path), signature)
+        
+        if eq_types:
             st.header("📐 Equation Analysis")
             
-            # Count equation types
-            eq_types = Counter()
-            symbols = Counter()
-            for doc in metadata_list:
-                for eq in doc.equations:
-                    eq_types[eq.equation_type] += 1
-                    symbols.update(eq.symbols)
-            
             col1, col2 = st.columns(2)
             
             with col1:
@@ -199,7 +331,7 @@ def show_academic():
             with col2:
                 # Most common symbols
                 if symbols:
-                    top_symbols = dict(sorted(symbols.items(), key=lambda x: x[1], reverse=True)[:10])
+                    top_symbols = dict(symbols.most_common(10))
                     fig = px.bar(
                         x=list(top_symbols.keys()),
                         y=list(top_symbols.values()),
@@ -209,5 +341,6 @@ def show_academic():
                     )
                     st.plotly_chart(fig, use_container_width=True)
 
-    if __name__ == "__main__":
-        main() 
\ No newline at end of file
+    # The navbar calls show_academic() from streamlit_app, where __name__ is the
+    # module's import name, so main() must not sit behind a __main__ guard
+    main() 
\ No newline at end of file
@@ -4,8 +4,8 @@ import os
 os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
 os.environ["IN_STREAMLIT"] = "true"
 
-import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -20,6 +20,152 @@ from src.file_processor import FileProcessor
 
 logger = logging.getLogger(__name__)
 
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _list_stores(db_root: str) -> list[str]:
+    """List store directories under the DB root, reused across reruns for a few seconds"""
+    with os.scandir(db_root) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _scan_store(store_path: str, dir_mtime: int) -> list[dict]:
+    """Build the document table rows for a store
+
+    The directory mtime in the cache key invalidates the rows when files are added
+    or removed; actions that rewrite files in place clear the cache explicitly.
+    """
+    # One directory pass yields names and stat results; companion files are then
+    # looked up in the name set instead of with per-file exists() calls
+    with os.scandir(store_path) as entries:
+        files = [(entry.name, entry.stat()) for entry in entries if entry.is_file()]
+    names = {name for name, _ in files}
+    
+    # Filter out system files
+    system_files = {"graph_chunk_entity_relation.graphml", "graph_visualization.html", 
+                    "kv_store_full_docs.json", "kv_store_llm_response_cache.json",
+                    "kv_store_text_chunks.json", "metadata.json", "vdb_chunks.json",
+                    "vdb_entities.json", "vdb_relationships.json"}
+    
+    pdf_files = [(name, stat) for name, stat in files if name.endswith(".pdf")]
+    txt_files = [
+        (name, stat) for name, stat in files
+        if name.endswith(".txt") and name not in system_files
+    ]
+    
+    # Collect file information for the document table
+    files_data = []
+    
+    # Add PDF files
+    for name, file_stat in pdf_files:
+        stem = name[:-len(".pdf")]
+        metadata_name = f"{stem}_metadata.json"
+        
+        # Get academic metadata if available
+        academic_info = ""
+        if metadata_name in names:
+            try:
+                metadata_file = Path(store_path) / metadata_name
+                metadata = AcademicMetadata.model_validate_json(metadata_file.read_bytes())
+                academic_info = f"📚 {len(metadata.references)} refs, {len(metadata.equations)} eqs"
+            except Exception as e:
+                logger.error(f"Error loading metadata for {name}: {e}")
+                academic_info = "❌ Metadata error"
+        
+        files_data.append({
+            "selected": False,
+            "name": name,
+            "type": "PDF",
+            "size": f"{file_stat.st_size / 1024:.1f} KB",
+            "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M"),
+            "status": "Processed" if f"{stem}.txt" in names else "Pending",
+            "academic": academic_info
+        })
+    
+    # Add text files
+    for name, file_stat in txt_files:
+        stem = name[:-len(".txt")]
+        metadata_name = f"{stem}_metadata.json"
+        
+        # Get academic metadata if available
+        academic_info = ""
+        if metadata_name in names:
+            try:
+                metadata_file = Path(store_path) / metadata_name
+                metadata = AcademicMetadata.model_validate_json(metadata_file.read_bytes())
+                academic_info = f"📚 {len(metadata.references)} refs, {len(metadata.equations)} eqs"
+            except Exception as e:
+                logger.error(f"Error loading metadata for {name}: {e}")
+                academic_info = "❌ Metadata error"
+        
+        files_data.append({
+            "selected": False,
+            "name": name,
+            "type": "Text",
+            "size": f"{file_stat.st_size / 1024:.1f} KB",
+            "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M"),
+            "status": "Source" if f"{stem}.pdf" in names else "Standalone",
+            "academic": academic_info
+        })
+    
+    return files_data
+
+
+def _store_rows(store_path: str) -> list[dict]:
+    """Current document table rows for a store, cached until the directory changes"""
+    return _scan_store(store_path, os.stat(store_path).st_mtime_ns)
+
+
+@st.cache_resource
+def get_conversion_executor() -> ThreadPoolExecutor:
+    """Create a shared worker pool for PDF conversion, kept alive across reruns"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-converter")
+
+
+def _convert_pending_files(file_processor: FileProcessor, pending_files: list[str], progress: dict) -> dict:
+    """Convert pending PDFs on a worker thread, reporting progress through a shared dict"""
+    total_files = len(pending_files)
+    for idx, file_path in enumerate(pending_files, 1):
+        file_name = os.path.basename(file_path)
+        progress["label"] = f"Converting {idx}/{total_files}: {file_name}"
+        
+        def update_status(msg: str):
+            progress["label"] = f"Converting {idx}/{total_files}: {file_name} ({msg})"
+        
+        result = file_processor.process_file(file_path, progress_callback=update_status)
+        if "error" in result:
+            return {"converted": idx - 1, "total": total_files, "error": f"Error processing {file_name}: {result['error']}"}
+    
+    return {"converted": total_files, "total": total_files}
+
+
+@st.fragment(run_every=1.0)
+def conversion_monitor():
+    """Poll the background conversion so the rest of the page stays responsive"""
+    future = st.session_state.get("conversion_future")
+    if future is None:
+        return
+    
+    if not future.done():
+        progress = st.session_state.get("conversion_progress", {})
+        st.status(progress.get("label", "Converting documents..."), state="running", expanded=False)
+        return
+    
+    # Collect the result exactly once, then refresh the whole page
+    st.session_state["conversion_future"] = None
+    try:
+        result = future.result()
+        if "error" in result:
+            st.session_state["conversion_message"] = (result["error"], "error")
+        else:
+            st.session_state["conversion_message"] = (f"✅ Converted {result['total']} document(s)", "complete")
+    except Exception as e:
+        st.session_state["conversion_message"] = (f"❌ Error during conversion: {str(e)}", "error")
+        logger.error(f"Error during batch conversion: {str(e)}", exc_info=True)
+    _scan_store.clear()
+    st.rerun()
+
+
 def show_manage():
     st.divider()
 
@@ -30,6 +176,7 @@ def show_manage():
         st.session_state['file_processor'] = None
         st.session_state['current_store'] = None
         st.session_state['config_manager'] = ConfigManager()
+        st.session_state['conversion_future'] = None
 
     def init_session_state():
         """Initialize session state variables"""
@@ -41,6 +188,8 @@ def show_manage():
             st.session_state['config_manager'] = ConfigManager()
         if 'status_container' not in st.session_state:
             st.session_state['status_container'] = None
+        if 'conversion_future' not in st.session_state:
+            st.session_state['conversion_future'] = None
 
     def process_files(uploaded_files, file_processor, status):
         """Save uploaded files without processing"""
@@ -91,7 +240,7 @@ def show_manage():
         st.write("### 📁 Document Manager")
         
         # Store selection in main content
-        stores = [d for d in os.listdir(DB_ROOT) if os.path.isdir(os.path.join(DB_ROOT, d))]
+        stores = _list_stores(DB_ROOT)
         
         # Calculate current store index
         current_index = 0
@@ -115,10 +264,12 @@ def show_manage():
                 if new_store:
                     store_path = create_store_directory(new_store)
                     if store_path:
+                        _list_stores.clear()
                         st.session_state["active_store"] = new_store
                         file_processor = FileProcessor(st.session_state["config_manager"])
                         file_processor.set_store_path(store_path)
                         st.session_state["file_processor"] = file_processor
+                        st.session_state["_fp_store"] = store_path
                         # Initialize status container
                         if 'status_container' not in st.session_state or st.session_state['status_container'] is None:
                             st.session_state['status_container'] = st.status("Ready", state="complete", expanded=False)
@@ -133,6 +284,7 @@ def show_manage():
                 file_processor = FileProcessor(st.session_state["config_manager"])
                 file_processor.set_store_path(store_path)
                 st.session_state["file_processor"] = file_processor
+                st.session_state["_fp_store"] = store_path
                 st.rerun()
             # Show upload section when store is selected
             if "active_store" in st.session_state and st.session_state["active_store"]:
@@ -151,15 +303,12 @@ def show_manage():
     if "active_store" in st.session_state and st.session_state["active_store"]:
         store_path = os.path.join(DB_ROOT, st.session_state["active_store"])
         
-        # Use cached file processor
-        if not st.session_state["file_processor"]:
-            file_processor = FileProcessor(st.session_state["config_manager"])
-            file_processor.set_store_path(store_path)
-            st.session_state["file_processor"] = file_processor
-        elif not st.session_state["file_processor"].store_path:
+        # Reuse the cached file processor (and its loaded Marker models) until the store changes
+        if not st.session_state["file_processor"] or st.session_state.get("_fp_store") != store_path:
             file_processor = FileProcessor(st.session_state["config_manager"])
             file_processor.set_store_path(store_path)
             st.session_state["file_processor"] = file_processor
+            st.session_state["_fp_store"] = store_path
         else:
             file_processor = st.session_state["file_processor"]
         
@@ -170,6 +319,7 @@ def show_manage():
             with status_container.container():
                 with st.status("Saving uploaded files...", expanded=True) as status:
                     results = process_files(uploaded_files, file_processor, status)
+                    _scan_store.clear()
                     
                     # Handle results in main thread
                     success_count = 0
@@ -198,6 +348,7 @@ def show_manage():
         doc_action_col1, doc_action_col2, doc_action_col3, doc_action_col4 = st.columns(4)
         with doc_action_col1:
             if st.button("🔄 Refresh Document List", key="refresh_btn", use_container_width=True):
+                _scan_store.clear()
                 st.rerun()
         with doc_action_col2:
             if st.button("🧹 Clean Unused Files", key="clean_btn", use_container_width=True):
@@ -211,73 +362,47 @@ def show_manage():
                                 status.update(label=f"✅ Removed {len(removed)} unused files", state="complete")
                             else:
                                 status.update(label="✓ No unused files found", state="complete")
+                    _scan_store.clear()
                     st.rerun()
         with doc_action_col3:
             if st.button("⚡ Convert Pending", key="convert_pending", use_container_width=True):
                 if file_processor:
-                    # Reinitialize file processor to ensure it has the latest methods
-                    file_processor = FileProcessor(st.session_state["config_manager"])
-                    file_processor.set_store_path(store_path)
-                    
                     with status_container.container():
-                        status = st.status("Checking for pending documents...", expanded=False)
                         # Get list of pending PDFs (those without corresponding txt files)
-                        pdf_files = list(Path(store_path).glob("*.pdf"))
-                        pending_files = []
-                        
-                        for pdf_file in pdf_files:
-                            txt_path = pdf_file.with_suffix(".txt")
-                            if not txt_path.exists():
-                                pending_files.append(str(pdf_file))
-                        
-                        if not pending_files:
-                            status.update(label="No pending documents to convert", state="complete")
-                            st.rerun()
+                        pending_files = [
+                            os.path.join(store_path, row["name"])
+                            for row in _store_rows(store_path)
+                            if row["type"] == "PDF" and row["status"] == "Pending"
+                        ]
                         
-                        try:
-                            total_files = len(pending_files)
-                            status.update(label=f"Converting {total_files} document(s)...")
-                            
-                            for idx, file_path in enumerate(pending_files, 1):
-                                file_name = os.path.basename(file_path)
-                                status.update(label=f"Converting {idx}/{total_files}: {file_name}")
-                                
-                                def update_status(msg: str):
-                                    status.update(label=f"Converting {idx}/{total_files}: {file_name}")
-                                
-                                result = file_processor.process_file(
-                                    file_path,
-                                    progress_callback=update_status
-                                )
-                                
-                                if "error" in result:
-                                    status.update(label=f"Error processing {file_name}: {result['error']}", state="error")
-                                    st.rerun()
-                            
-                            status.update(label=f"✅ Converted {total_files} document(s)", state="complete")
-                        except Exception as e:
-                            status.update(label=f"❌ Error during conversion: {str(e)}", state="error")
-                            logger.error(f"Error during batch conversion: {str(e)}", exc_info=True)
-                        
-                        st.rerun()
+                        if st.session_state["conversion_future"] is not None:
+                            st.status("A conversion is already running", state="running", expanded=False)
+                        elif not pending_files:
+                            st.status("No pending documents to convert", state="complete", expanded=False)
+                        else:
+                            # Convert on a worker thread; conversion_monitor polls the result
+                            progress = {"label": f"Converting {len(pending_files)} document(s)..."}
+                            st.session_state["conversion_progress"] = progress
+                            st.session_state["conversion_future"] = get_conversion_executor().submit(
+                                _convert_pending_files, file_processor, pending_files, progress
+                            )
         with doc_action_col4:
             if st.button("📊 View Academic Metadata", key="view_metadata", use_container_width=True):
                 st.switch_page("pages/Academic.py")
         
+        # Background conversion progress and its final outcome; the monitor is only
+        # mounted while a conversion runs so idle pages don't rerun every second
+        if st.session_state["conversion_future"] is not None:
+            conversion_monitor()
+        if "conversion_message" in st.session_state:
+            label, state = st.session_state.pop("conversion_message")
+            st.status(label, state=state, expanded=False)
+        
         try:
-            # Get list of PDF and text files
-            pdf_files = list(Path(store_path).glob("*.pdf"))
-            txt_files = list(Path(store_path).glob("*.txt"))
-            
-            # Filter out system files
-            system_files = ["graph_chunk_entity_relation.graphml", "graph_visualization.html", 
-                        "kv_store_full_docs.json", "kv_store_llm_response_cache.json",
-                        "kv_store_text_chunks.json", "metadata.json", "vdb_chunks.json",
-                        "vdb_entities.json", "vdb_relationships.json"]
-            
-            txt_files = [f for f in txt_files if f.name not in system_files]
+            # Document rows are cached until the store directory changes
+            files_data = _store_rows(store_path)
             
-            if not pdf_files and not txt_files:
+            if not files_data:
                 if 'status_container' not in st.session_state or st.session_state['status_container'] is None:
                     st.session_state['status_container'] = st.status("Ready", state="complete", expanded=False)
                 status = st.session_state['status_container']
@@ -288,63 +413,6 @@ def show_manage():
                 )
                 st.stop()
             
-            # Create DataFrame with file information
-            files_data = []
-            
-            # Add PDF files
-            for file in pdf_files:
-                file_stat = file.stat()
-                txt_file = file.with_suffix(".txt")
-                metadata_file = Path(store_path) / f"{file.stem}_metadata.json"
-                
-                # Get academic metadata if available
-                academic_info = ""
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = AcademicMetadata.from_dict(json.load(f))
-                            academic_info = f"📚 {len(metadata.references)} refs, {len(metadata.equations)} eqs"
-                    except Exception as e:
-                        logger.error(f"Error loading metadata for {file.name}: {e}")
-                        academic_info = "❌ Metadata error"
-                
-                files_data.append({
-                    "selected": False,
-                    "name": file.name,
-                    "type": "PDF",
-                    "size": f"{file_stat.st_size / 1024:.1f} KB",
-                    "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M"),
-                    "status": "Processed" if txt_file.exists() else "Pending",
-                    "academic": academic_info
-                })
-            
-            # Add text files
-            for file in txt_files:
-                file_stat = file.stat()
-                pdf_file = file.with_suffix(".pdf")
-                metadata_file = Path(store_path) / f"{file.stem}_metadata.json"
-                
-                # Get academic metadata if available
-                academic_info = ""
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = AcademicMetadata.from_dict(json.load(f))
-                            academic_info = f"📚 {len(metadata.references)} refs, {len(metadata.equations)} eqs"
-                    except Exception as e:
-                        logger.error(f"Error loading metadata for {file.name}: {e}")
-                        academic_info = "❌ Metadata error"
-                
-                files_data.append({
-                    "selected": False,
-                    "name": file.name,
-                    "type": "Text",
-                    "size": f"{file_stat.st_size / 1024:.1f} KB",
-                    "modified": datetime.fromtimestamp(file_stat.st_mtime).strftime("%Y-%m-%d %H:%M"),
-                    "status": "Source" if pdf_file.exists() else "Standalone",
-                    "academic": academic_info
-                })
-            
             # Create DataFrame
             df = pd.DataFrame(files_data)
             
@@ -492,14 +560,11 @@ def show_manage():
                         
                         # Force refresh only if files were actually deleted
                         if deleted_files:
+                            _scan_store.clear()
                             st.rerun()
                 
                 with selected_files_col2:
                     if st.button("🔄 Reprocess Selected", use_container_width=True):
-                        # Reinitialize file processor to ensure it has the latest methods
-                        file_processor = FileProcessor(st.session_state["config_manager"])
-                        file_processor.set_store_path(store_path)
-                        
                         with status_container.container():
                             with st.status("Reprocessing selected files...", expanded=True) as status:
                                 pdf_files = [f for f in selected_files if f.lower().endswith(".pdf")]
@@ -539,6 +604,7 @@ def show_manage():
                                     )
                                     logger.error(f"Error during batch reprocessing: {str(e)}", exc_info=True)
                         
+                        _scan_store.clear()
                         st.rerun()
         
         except Exception as e:
@@ -1,52 +1,317 @@
 import asyncio
+import hashlib
 import logging
 import os
+import pickle
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
 
 import streamlit as st
 
-try:
+from src.file_manager import DB_ROOT, create_store_directory
+from src.lightrag_helpers import AnswerCache, ResponseProcessor
+from src.lightrag_init import (
+    DEFAULT_EMBEDDING_BATCH_SIZE,
+    DEFAULT_LLM_MAX_ASYNC,
+    DEFAULT_MODEL,
+    MAX_WORKERS,
+    SUPPORTED_MODELS,
+    LightRAGManager,
+    LLMSettings,
+)
+
+# Streamlit re-executes this module on every rerun, so attach the handler once per process
+logger = logging.getLogger("lightrag_search")
+if not logger.handlers:
+    file_handler = logging.FileHandler('chat.log')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(file_handler)
+    logger.setLevel(logging.INFO)
+
+EXPORT_TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+DEFAULT_MAX_CONTEXT_TOKENS = 2000
+CHAT_STATE_FILE = "chat_state_{chat_id}.pkl"  # One file per browser chat in each store
+CHAT_RENDER_PAGE = 20  # Messages rendered per page of chat history
+FORMATTED_RESPONSE_TMPL = "{response}\n\n*Sources:*\n{sources}"
+
+# Queries currently being answered, shared across sessions so identical
+# concurrent prompts wait on one LLM call instead of issuing their own
+_inflight: Dict[tuple, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Create a persistent event loop running in a daemon thread, shared across reruns"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="lightrag-event-loop", daemon=True).start()
+    logger.info("Started persistent event loop")
+    return loop
+
+
+def run_async(coro):
+    """Run a coroutine on the persistent event loop and block until it completes"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+def iterate_async(agen):
+    """Drive an async generator on the persistent event loop and yield its items synchronously"""
+    loop = get_event_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        # A rerun can abandon the stream midway; close it on the loop so the
+        # pending LLM request and its connection are released, not left suspended
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop)
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache() -> AnswerCache:
+    """Completed answers keyed by (query, mode, store, model), shared by every session"""
+    return AnswerCache(max_entries=64, ttl=600)
+
+
+def format_response(response: str, sources: Tuple[str, ...] = ()) -> str:
+    """Chat message for an answer, with a Sources section only when there are sources"""
+    if not sources:
+        return response
+    return FORMATTED_RESPONSE_TMPL.format(
+        response=response,
+        sources="\n".join(f"- {source}" for source in sources),
+    )
+
+
+def get_chat_id() -> str:
+    """Id of this browser's chat, kept in the URL so a page refresh finds the same chat
+
+    Each new session without one gets its own, so concurrent users of a store
+    neither load nor overwrite each other's conversations.
+    """
+    chat_id = st.query_params.get("chat", "")
+    # The id becomes part of a file name, so accept only ids we could have issued
+    if len(chat_id) != 32 or any(c not in "0123456789abcdef" for c in chat_id):
+        chat_id = uuid.uuid4().hex
+        st.query_params["chat"] = chat_id
+    return chat_id
+
+
+def save_chat_state(store: str, chat_id: str, state: Dict) -> None:
+    """Persist a chat's state in its store, writing a temp file and renaming it into place"""
+    path = os.path.join(DB_ROOT, store, CHAT_STATE_FILE.format(chat_id=chat_id))
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.error(f"Error saving chat state for {store}: {str(e)}")
+
+
+def load_chat_state(store: str, chat_id: str) -> Optional[Dict]:
+    """Load a chat's persisted state in a store, if any"""
+    path = os.path.join(DB_ROOT, store, CHAT_STATE_FILE.format(chat_id=chat_id))
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.error(f"Error loading chat state for {store}: {str(e)}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (~4 characters per token)"""
+    return len(text) // 4
+
+
+def make_exchange(prompt: str, response: str) -> Dict:
+    """Conversation memory entry, pre-rendered so building the prompt only joins fragments
+
+    Takes the user's own prompt, not the query sent to LightRAG: that already
+    carries the earlier conversation, which would nest into every stored exchange.
+    """
+    text = f"User: {prompt}\nAssistant: {response}\n\n"
+    return {"query": prompt, "response": response, "text": text, "tokens": estimate_tokens(text)}
+
+
+def build_conversation_context(exchanges, summary: str, max_tokens: int) -> str:
+    """Prompt prefix with the summary and the newest exchanges that fit in max_tokens
+
+    Exchanges are oldest first, each a dict with its pre-rendered "text" and "tokens".
+    """
+    parts = ["Previous conversation:\n"]
+    # Older turns are represented by the cached summary, recent ones verbatim
+    if summary:
+        parts.append(f"Summary of earlier conversation: {summary}\n\n")
+
+    # Keep the newest exchanges that fit in the token budget
+    budget = max_tokens - sum(estimate_tokens(part) for part in parts)
+    kept = []
+    for exchange in reversed(exchanges):
+        budget -= exchange["tokens"]
+        if budget < 0:
+            break
+        kept.append(exchange["text"])
+    parts.extend(reversed(kept))
+    return "".join(parts)
+
+
+def claim_inflight(key: tuple) -> Tuple[Future, bool]:
+    """Return the future for an in-flight query and whether the caller owns it"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+def release_inflight(key: tuple) -> None:
+    """Forget an in-flight query once its owner is done with it"""
+    with _inflight_lock:
+        _inflight.pop(key, None)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_docx(text: str) -> bytes:
+    """Render text as a Word document, one paragraph per blank-line separated block"""
     from docx import Document
-except ImportError:
-    st.error("Could not import python-docx. Please install it with: pip install python-docx")
-    Document = None
-import networkx as nx
 
-try:
-    import xxhash
-except ImportError:
-    st.error("Could not import xxhash. Please install it with: pip install xxhash")
-    xxhash = None
+    document = Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph.strip())
+    buffer = BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
 
-from src.file_manager import DB_ROOT, create_store_directory
-from src.lightrag_helpers import ResponseProcessor
-from src.lightrag_init import DEFAULT_MODEL, SUPPORTED_MODELS, LightRAGManager
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-file_handler = logging.FileHandler('chat.log')
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+# Keyed on the store alone: two LightRAG instances on one working_dir would each
+# keep their own in-memory graph and overwrite each other's files when saving.
+# No max_entries for the same reason - evicting a manager would let a second one
+# be created for its store while the first is still in use.
+@st.cache_resource(show_spinner=False)
+def get_rag_manager(
+    input_dir: str,
+    _chunk_size: int,
+    _chunk_overlap: int,
+    _embedding_batch_size: int,
+    _llm_max_async: int,
+) -> LightRAGManager:
+    """Create the LightRAG manager for a store, shared by every session
+
+    Index settings apply when the store is first opened; key, model and
+    temperature are passed per request as LLMSettings.
+    """
+    return LightRAGManager(
+        input_dir=input_dir,
+        chunk_size=_chunk_size,
+        chunk_overlap=_chunk_overlap,
+        embedding_batch_size=_embedding_batch_size,
+        llm_max_async=_llm_max_async
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client(api_key_hash: str, _api_key: str):
+    """Create one OpenAI client per API key so its HTTP connection pool is reused"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=_api_key)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def analyze_graph(graph_path: str, mtime: float) -> Dict:
+    """Summary statistics for a knowledge graph, recomputed only when the file changes"""
+    import networkx as nx
+
+    # Only the small summary is cached; the parsed graph is released on return
+    graph = nx.read_graphml(graph_path)
+    node_count = graph.number_of_nodes()
+    if not node_count:
+        return {"nodes": 0, "edges": graph.number_of_edges(), "avg_degree": 0}
+
+    degrees = dict(graph.degree())
+    return {
+        "nodes": node_count,
+        "edges": graph.number_of_edges(),
+        "avg_degree": round(sum(degrees.values()) / node_count, 2),
+        "density": nx.density(graph),
+        "components": nx.number_connected_components(graph.to_undirected()),
+        "top_nodes": sorted(degrees.items(), key=lambda x: x[1], reverse=True)[:5],
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def get_indexing_executor() -> ThreadPoolExecutor:
+    """Create a shared worker pool for document indexing, kept alive across reruns"""
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="lightrag-indexer")
+
+
+@st.fragment(run_every=1.0)
+def indexing_monitor():
+    """Poll the background indexing so the rest of the page stays responsive"""
+    future = st.session_state.get("indexing_future")
+    if future is None:
+        return
+    
+    if not future.done():
+        elapsed = time.monotonic() - st.session_state["indexing_started"]
+        st.status(f"Indexing documents... ({elapsed:.0f}s)", state="running", expanded=False)
+        return
+    
+    # Collect the result exactly once, then refresh the whole page
+    st.session_state["indexing_future"] = None
+    try:
+        future.result()
+        st.session_state["status_ready"] = True
+        st.session_state["indexing_message"] = ("Documents indexed", "complete")
+    except Exception as e:
+        st.session_state["indexing_message"] = (f"Indexing failed: {str(e)}", "error")
+        logger.error(f"Indexing error: {str(e)}", exc_info=True)
+    st.rerun()
+
 
 def show_search():
     # Initialize session states
     if "rag_manager" not in st.session_state:
         st.session_state["rag_manager"] = None
+    if "llm_settings" not in st.session_state:
+        st.session_state["llm_settings"] = None
     if "response_processor" not in st.session_state:
         st.session_state["response_processor"] = ResponseProcessor()
     if "chat_history" not in st.session_state:
         st.session_state["chat_history"] = []
-    if "conversation_context" not in st.session_state:
-        st.session_state["conversation_context"] = []
     if "max_context_length" not in st.session_state:
         st.session_state["max_context_length"] = 5
+    if "max_context_tokens" not in st.session_state:
+        st.session_state["max_context_tokens"] = DEFAULT_MAX_CONTEXT_TOKENS
+    if "conversation_context" not in st.session_state:
+        st.session_state["conversation_context"] = deque(
+            maxlen=st.session_state["max_context_length"]
+        )
     if "chat_settings" not in st.session_state:
         st.session_state["chat_settings"] = {
             "memory_enabled": True,
             "context_length": 5,
             "summarize_enabled": True,
+            "summarize_threshold": 10,
         }
+    if "conversation_summary" not in st.session_state:
+        st.session_state["conversation_summary"] = ""
+    if "messages_at_summary" not in st.session_state:
+        st.session_state["messages_at_summary"] = 0
     if "status_ready" not in st.session_state:
         st.session_state["status_ready"] = False
     if "active_store" not in st.session_state:
@@ -55,81 +320,146 @@ def show_search():
         st.session_state["api_key_shown"] = False
     if "openai_api_key" not in st.session_state:
         st.session_state["openai_api_key"] = os.getenv("OPENAI_API_KEY", "")
+    if "indexing_future" not in st.session_state:
+        st.session_state["indexing_future"] = None
+    if "context_version" not in st.session_state:
+        st.session_state["context_version"] = 0
+    if "chat_render_window" not in st.session_state:
+        st.session_state["chat_render_window"] = CHAT_RENDER_PAGE
+
+    # Restore the persisted chat when a store is (re)selected
+    active_store = st.session_state["active_store"]
+    if active_store and st.session_state.get("chat_state_store") != active_store:
+        st.session_state["chat_state_store"] = active_store
+        saved = load_chat_state(active_store, get_chat_id()) or {}
+        st.session_state["chat_history"] = saved.get("chat_history", [])
+        st.session_state["conversation_context"] = deque(
+            saved.get("conversation_context", []),
+            maxlen=st.session_state["max_context_length"],
+        )
+        st.session_state["conversation_summary"] = saved.get("conversation_summary", "")
+        st.session_state["messages_at_summary"] = saved.get("messages_at_summary", 0)
 
     # Helper functions
-    def manage_conversation_context(query: str, response: str):
+    def persist_chat_state():
+        """Save the chat for the active store so it survives a page refresh"""
+        ss = st.session_state
+        if not ss["active_store"]:
+            return
+        save_chat_state(ss["active_store"], get_chat_id(), {
+            "chat_history": ss["chat_history"],
+            "conversation_context": list(ss["conversation_context"]),
+            "conversation_summary": ss["conversation_summary"],
+            "messages_at_summary": ss["messages_at_summary"],
+        })
+
+
+    def manage_conversation_context(prompt: str, response: str):
         """Manage conversation context by adding new exchanges and maintaining context length"""
-        if st.session_state["chat_settings"]["memory_enabled"]:
-            st.session_state["conversation_context"].append(
-                {"query": query, "response": response}
-            )
-            # Trim context if it exceeds max length
-            if (
-                len(st.session_state["conversation_context"])
-                > st.session_state["max_context_length"]
-            ):
-                st.session_state["conversation_context"].pop(0)
+        ss = st.session_state
+        if ss["chat_settings"]["memory_enabled"]:
+            # The deque's maxlen evicts the oldest exchange
+            ss["conversation_context"].append(make_exchange(prompt, response))
+            ss["context_version"] += 1
 
 
     def get_conversation_context() -> str:
         """Format conversation context for the LLM"""
-        if not st.session_state["chat_settings"]["memory_enabled"]:
+        ss = st.session_state
+        if not ss["chat_settings"]["memory_enabled"]:
             return ""
 
-        context = "Previous conversation:\n"
-        for exchange in st.session_state["conversation_context"]:
-            context += f"User: {exchange['query']}\nAssistant: {exchange['response']}\n\n"
+        # Reuse the last built string until the context, summary or budget changes;
+        # replacing the deque (clear, resize, restore) changes its id
+        ctx = ss["conversation_context"]
+        cache_key = (id(ctx), ss["context_version"], ss["conversation_summary"], ss["max_context_tokens"])
+        cached = ss.get("conversation_context_str")
+        if cached and cached[0] == cache_key:
+            return cached[1]
+
+        context = build_conversation_context(ctx, ss["conversation_summary"], ss["max_context_tokens"])
+        ss["conversation_context_str"] = (cache_key, context)
         return context
 
 
     def export_chat_history(chat_history: List[Dict]) -> str:
         """Export chat history to formatted text"""
-        formatted_history = []
-        for message in chat_history:
-            role = message["role"].capitalize()
-            content = message["content"]
-            formatted_history.append(f"{role}: {content}\n")
-        return "\n".join(formatted_history)
+        # A single join is cheaper than hashing the history for a cache lookup
+        return "\n".join(
+            f"{message['role'].capitalize()}: {message['content']}\n" for message in chat_history
+        )
 
 
     def clear_chat_history():
         """Clear chat history and reset session states"""
         st.session_state["chat_history"] = []
-        st.session_state["conversation_context"] = []
+        st.session_state["conversation_context"] = deque(
+            maxlen=st.session_state["max_context_length"]
+        )
+        st.session_state["conversation_summary"] = ""
+        st.session_state["messages_at_summary"] = 0
+        st.session_state["chat_render_window"] = CHAT_RENDER_PAGE
+        persist_chat_state()
 
 
     def should_summarize_conversation() -> bool:
         """Check if conversation should be summarized based on settings and length"""
-        if not st.session_state["chat_settings"]["summarize_enabled"]:
+        ss = st.session_state
+        if not ss["chat_settings"]["summarize_enabled"]:
             return False
 
-        # Check if conversation is long enough to warrant summarization
-        message_count = len(st.session_state["chat_history"])
-        return message_count > st.session_state["max_context_length"] * 2
+        # Only compact again once the threshold is crossed since the last summary
+        new_messages = len(ss["chat_history"]) - ss["messages_at_summary"]
+        return new_messages > ss["chat_settings"].get("summarize_threshold", 10)
 
 
-    async def summarize_conversation() -> str:
+    async def summarize_conversation(
+        rag_manager: LightRAGManager, chat_history: List[Dict], settings: LLMSettings
+    ) -> str:
         """Summarize the current conversation using LightRAG"""
+        # Prepare conversation for summarization
+        conversation_text = export_chat_history(chat_history)
+
+        # Create summarization prompt
+        summary_prompt = (
+            "Please provide a concise summary of the following conversation, "
+            "highlighting the main topics discussed and key conclusions:\n\n"
+            f"{conversation_text}"
+        )
+
+        # Get summary using LightRAG
+        result = await rag_manager.aquery(summary_prompt, settings=settings)
+        return result["response"]
+
+
+    def generate_summary() -> str:
+        """Run the summarization on the persistent event loop"""
         try:
-            # Prepare conversation for summarization
-            conversation_text = export_chat_history(st.session_state["chat_history"])
-
-            # Create summarization prompt
-            summary_prompt = (
-                "Please provide a concise summary of the following conversation, "
-                "highlighting the main topics discussed and key conclusions:\n\n"
-                f"{conversation_text}"
+            # Session state is only reachable from the script thread, so resolve it here
+            return run_async(
+                summarize_conversation(
+                    st.session_state["rag_manager"],
+                    st.session_state["chat_history"],
+                    st.session_state["llm_settings"],
+                )
             )
 
-            # Get summary using LightRAG
-            result = st.session_state["rag_manager"].query(summary_prompt)
-            return result["response"]
-
         except Exception as e:
             st.error(f"Error summarizing conversation: {str(e)}")
             return "Error generating summary"
 
 
+    async def batch_query(
+        rag_manager: LightRAGManager, queries: List[str], mode: str, settings: LLMSettings
+    ) -> List:
+        """Run several queries concurrently so their LLM round-trips overlap"""
+        # Failures are returned in place so one bad query doesn't discard the rest
+        return await asyncio.gather(
+            *(rag_manager.aquery(q, mode=mode, settings=settings) for q in queries),
+            return_exceptions=True,
+        )
+
+
     def update_conversation_with_summary(summary: str):
         """Update conversation history with summary and reset context"""
         try:
@@ -144,20 +474,22 @@ def show_search():
                 ),
             }
 
+            ss = st.session_state
+
             # Keep recent messages
-            recent_messages = st.session_state["chat_history"][
-                -st.session_state["max_context_length"] :
-            ]
+            recent_messages = ss["chat_history"][-ss["max_context_length"] :]
 
             # Update chat history with summary and recent messages
-            st.session_state["chat_history"] = [summary_message] + recent_messages
+            ss["chat_history"] = [summary_message] + recent_messages
+            ss["conversation_summary"] = summary
+            ss["messages_at_summary"] = len(ss["chat_history"])
 
             # Update conversation context
-            st.session_state["conversation_context"] = []
-            for msg in recent_messages:
-                if msg["role"] == "assistant":
+            ss["conversation_context"] = deque(maxlen=ss["max_context_length"])
+            for i, msg in enumerate(recent_messages):
+                if msg["role"] == "assistant" and i > 0:
                     manage_conversation_context(
-                        recent_messages[recent_messages.index(msg) - 1]["content"],
+                        recent_messages[i - 1]["content"],
                         msg["content"],
                     )
 
@@ -185,14 +517,14 @@ def show_search():
     def rewrite_prompt(prompt: str) -> str:
         """Rewrite the user prompt into a templated format using OpenAI."""
         try:
-            from openai import OpenAI
-            
             # Use API key from session state
-            if not st.session_state.get("openai_api_key"):
+            api_key = st.session_state.get("openai_api_key")
+            if not api_key:
                 st.error("OpenAI API key not found in session state")
                 return prompt
                 
-            client = OpenAI(api_key=st.session_state["openai_api_key"])
+            # Reusing the client keeps the TLS connection to OpenAI warm between rewrites
+            client = get_openai_client(hashlib.sha256(api_key.encode()).hexdigest(), api_key)
             
             system_instruction = """
             You are a prompt engineering assistant. Your task is to rewrite user prompts into a templated format.
@@ -218,16 +550,18 @@ def show_search():
             - '> Sources: $SOURCE1, $SOURCE2, ...' where SOURCE1, SOURCE2, etc. are the sources you used to justify your answer.
             """
 
-            response = client.chat.completions.create(
+            stream = client.chat.completions.create(
                 model="gpt-4",  # Using GPT-4 for better prompt engineering
                 messages=[
                     {"role": "system", "content": system_instruction},
                     {"role": "user", "content": f"Rewrite this prompt: {prompt}"}
                 ],
-                temperature=0.7
+                temperature=0.7,
+                stream=True
             )
             
-            rewritten = response.choices[0].message.content
+            # Show the rewrite as it is generated instead of after the full completion
+            rewritten = st.write_stream(stream)
             logger.info(f"Prompt rewritten ({len(prompt)} → {len(rewritten)} chars)")
             return rewritten
             
@@ -237,6 +571,263 @@ def show_search():
             # Return original prompt if rewrite fails
             return prompt
 
+
+    @st.fragment
+    def chat_fragment():
+        """Chat history, controls and input; reruns on its own instead of the whole page"""
+        # Add chat controls
+        chat_controls_col1, chat_controls_col2 = st.columns([2, 1])
+        with chat_controls_col1:
+            if st.session_state["chat_history"]:
+                if st.button("Export Chat"):
+                    chat_export = export_chat_history(st.session_state["chat_history"])
+                    # One timestamp for both downloads so their file names match
+                    stamp = datetime.now().strftime(EXPORT_TIMESTAMP_FORMAT)
+                    st.download_button(
+                        "Download Chat History",
+                        chat_export,
+                        file_name=f"LightRAG_Chat_{stamp}.txt",
+                    )
+                    try:
+                        st.download_button(
+                            "Download as Word",
+                            get_docx(chat_export),
+                            file_name=f"LightRAG_Chat_{stamp}.docx",
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        )
+                    except ImportError:
+                        st.error("Could not import python-docx. Please install it with: pip install python-docx")
+        with chat_controls_col2:
+            if st.session_state["chat_history"]:
+                if st.button("Clear Chat"):
+                    clear_chat_history()
+                    st.rerun(scope="fragment")
+
+        # Batch queries
+        with st.expander("Batch Queries", expanded=False):
+            batch_text = st.text_area(
+                "Queries",
+                help="One query per line; they are answered concurrently without conversation memory",
+                key="batch_queries",
+            )
+            if st.button("Run Batch", type="secondary"):
+                queries = [q.strip() for q in batch_text.splitlines() if q.strip()]
+                if not queries:
+                    st.info("Enter at least one query.")
+                else:
+                    with st.status(f"Running {len(queries)} queries..."):
+                        results = run_async(
+                            batch_query(
+                                st.session_state["rag_manager"],
+                                queries,
+                                st.session_state["search_mode"].lower(),
+                                st.session_state["llm_settings"],
+                            )
+                        )
+                    for batch_prompt, batch_result in zip(queries, results):
+                        if isinstance(batch_result, Exception):
+                            logger.error(f"Batch query failed: {str(batch_result)}")
+                            content = f"Error processing query: {str(batch_result)}"
+                        else:
+                            content = batch_result["response"]
+                        st.session_state["chat_history"].append({"role": "user", "content": batch_prompt})
+                        st.session_state["chat_history"].append({"role": "assistant", "content": content})
+                    persist_chat_state()
+                    st.rerun(scope="fragment")
+
+        # Display chat history with enhanced formatting; Streamlit re-sends every
+        # element on each rerun, so only the most recent window is rendered
+        chat_history = st.session_state["chat_history"]
+        window = st.session_state["chat_render_window"]
+        hidden = len(chat_history) - window
+        if hidden > 0:
+            if st.button(f"Show earlier messages ({hidden} hidden)", type="tertiary"):
+                st.session_state["chat_render_window"] += CHAT_RENDER_PAGE
+                st.rerun(scope="fragment")
+        for message in chat_history[-window:]:
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
+        # Chat input
+        if prompt := st.chat_input("Type your message here...", key="chat_input"):
+            logger.info(f"Chat input received: {prompt}")
+            ss = st.session_state
+            chat_history = ss["chat_history"]
+            # The chat controls above only appear once there is history
+            had_history = bool(chat_history)
+
+            # Add user message to chat history
+            chat_history.append({"role": "user", "content": prompt})
+
+            try:
+                # Get conversation context
+                context = get_conversation_context()
+                logger.debug(f"Context retrieved: {context}")
+
+                # Prepare query with context
+                query = f"{context}\nCurrent query: {prompt}" if context else prompt
+                logger.info(f"Prepared query: {query}")
+
+                # Rewrite prompt if enabled
+                if ss.get("rewrite_prompt", False):
+                    with st.status("Rewriting prompt..."):
+                        query = rewrite_prompt(query)
+                        logger.info(f"Rewritten query: {query}")
+
+                # Show the prompt while the answer streams in below it
+                with st.chat_message("user"):
+                    st.markdown(prompt)
+
+                # Get the search mode
+                mode = ss["search_mode"].lower()
+                logger.info(f"Using search mode: {mode}")
+
+                rag_manager = ss["rag_manager"]
+                settings = ss["llm_settings"]
+                cache_key = (query, mode, ss["active_store"], settings.model_name, settings.temperature)
+                answer_slot = None  # Holds the streamed answer, if this pass streamed one
+                # Identical queries against the same store, model and temperature are answered from cache
+                response_text = get_answer_cache().get(cache_key)
+                if response_text is not None:
+                    logger.info("Answer served from query cache")
+                else:
+                    inflight, is_owner = claim_inflight(cache_key)
+                    if not is_owner:
+                        with st.spinner("Waiting for the same query already in progress..."):
+                            response_text = inflight.result()
+                    else:
+                        try:
+                            # Stream the response into the chat as it is generated
+                            with st.chat_message("assistant"):
+                                answer_slot = st.empty()
+                                with answer_slot.container():
+                                    streamed = st.write_stream(
+                                        iterate_async(rag_manager.astream(query, mode=mode, settings=settings))
+                                    )
+
+                            # Apply academic formatting once the full text is available
+                            response_text = rag_manager.response_processor.process_response(streamed)
+                            if response_text:
+                                get_answer_cache().set(cache_key, response_text)
+                            inflight.set_result(response_text)
+                        except Exception as e:
+                            inflight.set_exception(e)
+                            raise
+                        finally:
+                            # A rerun can interrupt the owner; don't leave waiters hanging
+                            if not inflight.done():
+                                inflight.cancel()
+                            release_inflight(cache_key)
+
+                logger.info(f"Query result ({mode}): {response_text}")
+
+                if response_text:
+                    # Streamed answers carry no source list, so no Sources section is added
+                    formatted_response = format_response(response_text)
+
+                    # Add assistant response to chat history
+                    chat_history.append({
+                        "role": "assistant",
+                        "content": formatted_response
+                    })
+                    logger.info("Response added to chat history")
+
+                    # Replace the raw stream with the stored message; cached answers
+                    # weren't streamed, so show them in this pass
+                    if answer_slot is not None:
+                        answer_slot.markdown(formatted_response)
+                    else:
+                        with st.chat_message("assistant"):
+                            st.markdown(formatted_response)
+
+                    # Remember what the user asked, not the context-laden query
+                    manage_conversation_context(prompt, response_text)
+
+                    # Check if conversation should be summarized
+                    summarized = False
+                    if should_summarize_conversation():
+                        with st.status("Summarizing conversation..."):
+                            summary = generate_summary()
+                            update_conversation_with_summary(summary)
+                        summarized = True
+
+                    persist_chat_state()
+
+                    # The new exchange is already on screen; only rerun when the
+                    # rendered history no longer matches (summary, first message)
+                    if summarized or not had_history:
+                        st.rerun(scope="fragment")
+                else:
+                    logger.error("No valid response received")
+                    st.error("Failed to get a response. Please try again.")
+
+            except Exception as e:
+                logger.error(f"Error processing chat: {str(e)}", exc_info=True)
+                st.error(f"Error processing chat: {str(e)}")
+
+
+    @st.fragment
+    def chat_settings_fragment():
+        """Chat settings; changing a setting reruns only this panel, not the chat or graph"""
+        with st.expander("💬 Chat Settings", expanded=False):
+            st.session_state["chat_settings"]["memory_enabled"] = st.toggle(
+                "Enable Conversation Memory",
+                value=True,
+                help="Keep track of conversation context",
+            )
+            if st.session_state["chat_settings"]["memory_enabled"]:
+                st.session_state["max_context_length"] = st.slider(
+                    "Context Length",
+                    min_value=1,
+                    max_value=10,
+                    value=5,
+                    help="Number of previous exchanges to remember",
+                )
+                st.session_state["max_context_tokens"] = st.slider(
+                    "Context Token Budget",
+                    min_value=500,
+                    max_value=8000,
+                    value=DEFAULT_MAX_CONTEXT_TOKENS,
+                    step=250,
+                    help="Approximate number of tokens of conversation history sent with each query",
+                )
+                # Resize the context window when the slider changes
+                context = st.session_state["conversation_context"]
+                if context.maxlen != st.session_state["max_context_length"]:
+                    st.session_state["conversation_context"] = deque(
+                        context, maxlen=st.session_state["max_context_length"]
+                    )
+
+            st.divider()
+
+            # Summarization settings
+            st.subheader("Summarization")
+            st.session_state["chat_settings"]["summarize_enabled"] = st.toggle(
+                "Auto-Summarize Long Conversations",
+                value=True,
+                help="Automatically summarize long conversations to maintain context",
+            )
+
+            if st.session_state["chat_settings"]["summarize_enabled"]:
+                st.session_state["chat_settings"]["summarize_threshold"] = st.slider(
+                    "Summarization Threshold",
+                    min_value=5,
+                    max_value=20,
+                    value=10,
+                    help="Number of messages before triggering auto-summarization",
+                )
+
+                if st.button("Summarize Now", type="secondary"):
+                    if len(st.session_state["chat_history"]) > 2:
+                        with st.status("Manually summarizing conversation..."):
+                            summary = generate_summary()
+                            update_conversation_with_summary(summary)
+                            persist_chat_state()
+                            st.success("Conversation summarized!")
+                            st.rerun()
+                    else:
+                        st.info("Not enough conversation history to summarize.")
+
     st.divider()
     
     # Main interface
@@ -270,6 +861,20 @@ def show_search():
                 chunk_overlap = st.number_input(
                     "Chunk overlap", value=50, help="Overlap between text chunks"
                 )
+                embedding_batch_size = st.number_input(
+                    "Embedding batch size",
+                    min_value=1,
+                    value=DEFAULT_EMBEDDING_BATCH_SIZE,
+                    help="Number of chunks sent per embeddings API call",
+                )
+                llm_max_async = st.slider(
+                    "LLM concurrency",
+                    min_value=4,
+                    max_value=128,
+                    value=DEFAULT_LLM_MAX_ASYNC,
+                    step=4,
+                    help="Maximum concurrent LLM calls; raise it only if your OpenAI rate limit allows",
+                )
                 temperature = st.slider(
                     "Temperature",
                     min_value=0.0,
@@ -297,16 +902,34 @@ def show_search():
                         
                         # Store API key in session state
                         st.session_state["openai_api_key"] = api_key
+                        # Key, model and temperature belong to this session and go with each request
+                        st.session_state["llm_settings"] = LLMSettings(
+                            api_key=api_key, model_name=model, temperature=temperature
+                        )
                         
-                        # Initialize LightRAG manager with correct parameters
-                        st.session_state["rag_manager"] = LightRAGManager(
-                            api_key=st.session_state["openai_api_key"],
-                            input_dir=store_path,
-                            model_name=model,
-                            chunk_size=chunk_size,
-                            chunk_overlap=chunk_overlap,
-                            temperature=temperature
+                        # Answers from a previous index may no longer hold
+                        get_answer_cache().clear()
+                        
+                        # Reuse the shared LightRAG manager for this store
+                        rag_manager = get_rag_manager(
+                            store_path,
+                            chunk_size,
+                            chunk_overlap,
+                            embedding_batch_size,
+                            llm_max_async,
                         )
+                        st.session_state["rag_manager"] = rag_manager
+                        chunk_config = rag_manager.config_manager.get_config()
+                        if (
+                            (chunk_config.chunk_size, chunk_config.chunk_overlap)
+                            != (chunk_size, chunk_overlap)
+                            or (rag_manager.embedding_batch_size, rag_manager.llm_max_async)
+                            != (embedding_batch_size, llm_max_async)
+                        ):
+                            st.info(
+                                "This store is already open with different advanced settings; "
+                                "it keeps those until the app restarts."
+                            )
                         
                         # Validate store using DocumentValidator
                         validation_results = st.session_state["rag_manager"].validator.validate_store(store_path)
@@ -316,10 +939,15 @@ def show_search():
                                 st.warning(f"Validation warning: {error}")
                         
                         if validation_results['valid_files']:
-                            with st.status("Indexing documents..."):
-                                st.session_state["rag_manager"].load_documents(validation_results['valid_files'])
-                                st.toast("Documents indexed successfully!")
-                                st.session_state["status_ready"] = True
+                            # Index on a worker thread; indexing_monitor polls it below the form. The
+                            # manager is shared, so it skips files another session already indexed
+                            st.session_state["status_ready"] = False
+                            st.session_state["indexing_started"] = time.monotonic()
+                            st.session_state["indexing_future"] = get_indexing_executor().submit(
+                                st.session_state["rag_manager"].load_new_documents,
+                                validation_results['valid_files'],
+                                settings=st.session_state["llm_settings"],
+                            )
                         else:
                             st.info("No valid files found. Please add documents in the Manage Documents page.")
                             st.session_state["status_ready"] = True
@@ -330,6 +958,16 @@ def show_search():
                     st.error(f"Configuration error: {str(e)}")
                     logger.error(f"Configuration error: {str(e)}", exc_info=True)
 
+    # Background indexing progress and its final outcome; the monitor is only
+    # mounted while indexing runs so idle pages don't rerun every second
+    if st.session_state["indexing_future"] is not None:
+        indexing_monitor()
+    if "indexing_message" in st.session_state:
+        label, state = st.session_state.pop("indexing_message")
+        st.status(label, state=state, expanded=False)
+        if state == "complete":
+            st.toast("Documents indexed successfully!")
+
     st.divider()
 
     # Create two columns for the main interface
@@ -338,7 +976,6 @@ def show_search():
     with col1:
         # Chat interface
         chat_container = st.container()
-        st.write(st.session_state["rag_manager"])
         
         with chat_container:
             is_ready, status_msg = check_lightrag_ready()
@@ -378,101 +1015,7 @@ def show_search():
                     )
                     st.session_state["rewrite_prompt"] = (rewrite == "Rewrite")
 
-                # Add chat controls
-                chat_controls_col1, chat_controls_col2 = st.columns([2, 1])
-                with chat_controls_col1:
-                    if st.session_state["chat_history"]:
-                        if st.button("Export Chat"):
-                            chat_export = export_chat_history(st.session_state["chat_history"])
-                            current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                            st.download_button(
-                                "Download Chat History",
-                                chat_export,
-                                file_name=f"LightRAG_Chat_{current_time}.txt",
-                            )
-                with chat_controls_col2:
-                    if st.session_state["chat_history"]:
-                        if st.button("Clear Chat"):
-                            clear_chat_history()
-                            st.rerun()
-
-                # Display chat history with enhanced formatting
-                for message in st.session_state["chat_history"]:
-                    with st.chat_message(message["role"]):
-                        st.markdown(message["content"])
-
-                # Chat input
-                if prompt := st.chat_input("Type your message here...", key="chat_input"):
-                    logger.info(f"Chat input received: {prompt}")
-                    
-                    # Add user message to chat history
-                    st.session_state["chat_history"].append({"role": "user", "content": prompt})
-
-                    try:
-                        # Get conversation context
-                        context = get_conversation_context()
-                        logger.debug(f"Context retrieved: {context}")
-
-                        # Prepare query with context
-                        query = f"{context}\nCurrent query: {prompt}" if context else prompt
-                        logger.info(f"Prepared query: {query}")
-                        
-                        # Rewrite prompt if enabled
-                        if st.session_state.get("rewrite_prompt", False):
-                            with st.status("Rewriting prompt..."):
-                                query = rewrite_prompt(query)
-                                logger.info(f"Rewritten query: {query}")
-
-                        # Process query with progress indicator
-                        with st.status("Processing...") as status:
-                            # Get the search mode
-                            mode = st.session_state["search_mode"].lower()
-                            logger.info(f"Using search mode: {mode}")
-                            
-                            # Execute query with mode
-                            result = st.session_state["rag_manager"].query(
-                                query,
-                                mode=mode
-                            )
-                            logger.info(f"Query result: {result}")
-
-                            if result and result.get("response"):
-                                # Format response with sources
-                                formatted_response = (
-                                    f"{result['response']}\n\n"
-                                    f"*Sources:*\n"
-                                )
-                                
-                                # Add sources if available
-                                if result.get("sources"):
-                                    sources_text = "\n".join([f"- {source}" for source in result["sources"]])
-                                    formatted_response += sources_text
-                                
-                                # Add assistant response to chat history
-                                st.session_state["chat_history"].append({
-                                    "role": "assistant",
-                                    "content": formatted_response
-                                })
-                                logger.info("Response added to chat history")
-                                
-                                # Update conversation context
-                                manage_conversation_context(query, result["response"])
-                                
-                                # Check if conversation should be summarized
-                                if should_summarize_conversation():
-                                    with st.status("Summarizing conversation..."):
-                                        summary = asyncio.run(summarize_conversation())
-                                        update_conversation_with_summary(summary)
-                                
-                                # Force streamlit to rerun and show the new message
-                                st.rerun()
-                            else:
-                                logger.error("No valid response received")
-                                st.error("Failed to get a response. Please try again.")
-
-                    except Exception as e:
-                        logger.error(f"Error processing chat: {str(e)}", exc_info=True)
-                        st.error(f"Error processing chat: {str(e)}")
+                chat_fragment()
 
     with col2:
         # Session information
@@ -489,53 +1032,11 @@ def show_search():
             # System info with icons
             st.write("**Messages:**", len(st.session_state["chat_history"]))
             if st.session_state["rag_manager"]:
-                st.write("**Model:**", st.session_state["rag_manager"].model_name)
+                st.write("**Model:**", st.session_state["llm_settings"].model_name)
                 st.write("**Store:**", st.session_state["rag_manager"].input_dir)
 
         # Chat settings
-        with st.expander("💬 Chat Settings", expanded=False):
-            st.session_state["chat_settings"]["memory_enabled"] = st.toggle(
-                "Enable Conversation Memory",
-                value=True,
-                help="Keep track of conversation context",
-            )
-            if st.session_state["chat_settings"]["memory_enabled"]:
-                st.session_state["max_context_length"] = st.slider(
-                    "Context Length",
-                    min_value=1,
-                    max_value=10,
-                    value=5,
-                    help="Number of previous exchanges to remember",
-                )
-
-            st.divider()
-
-            # Summarization settings
-            st.subheader("Summarization")
-            st.session_state["chat_settings"]["summarize_enabled"] = st.toggle(
-                "Auto-Summarize Long Conversations",
-                value=True,
-                help="Automatically summarize long conversations to maintain context",
-            )
-
-            if st.session_state["chat_settings"]["summarize_enabled"]:
-                st.session_state["chat_settings"]["summarize_threshold"] = st.slider(
-                    "Summarization Threshold",
-                    min_value=5,
-                    max_value=20,
-                    value=10,
-                    help="Number of messages before triggering auto-summarization",
-                )
-
-                if st.button("Summarize Now", type="secondary"):
-                    if len(st.session_state["chat_history"]) > 2:
-                        with st.status("Manually summarizing conversation..."):
-                            summary = asyncio.run(summarize_conversation())
-                            update_conversation_with_summary(summary)
-                            st.success("Conversation summarized!")
-                            st.rerun()
-                    else:
-                        st.info("Not enough conversation history to summarize.")
+        chat_settings_fragment()
 
     # Add Knowledge Graph section at the bottom
     if "show_graph" in st.session_state and st.session_state["show_graph"]:
@@ -556,42 +1057,42 @@ def show_search():
                     if not os.path.exists(graph_path):
                         st.warning("⚠️ Knowledge Graph not found. Please initialize and index documents first.")
                     else:
-                        # Load and analyze graph
-                        graph = nx.read_graphml(graph_path)
+                        try:
+                            import xxhash
+                        except ImportError:
+                            st.error("Could not import xxhash. Please install it with: pip install xxhash")
+                            xxhash = None
+
+                        # Load and analyze graph once per file version, not on every rerun
+                        graph_mtime = os.path.getmtime(graph_path)
+                        stats = analyze_graph(graph_path, graph_mtime)
                         
                         # Basic stats in columns
                         with stats_col1:
-                            st.metric("Total Nodes", graph.number_of_nodes())
+                            st.metric("Total Nodes", stats["nodes"])
                         with stats_col2:
-                            st.metric("Total Edges", graph.number_of_edges())
+                            st.metric("Total Edges", stats["edges"])
                         with stats_col3:
-                            avg_degree = round(sum(dict(graph.degree()).values()) / graph.number_of_nodes(), 2) if graph.number_of_nodes() > 0 else 0
-                            st.metric("Average Degree", avg_degree)
+                            st.metric("Average Degree", stats["avg_degree"])
                         
                         # Detailed analysis in two columns
                         analysis_col1, analysis_col2 = st.columns([1, 1])
                         
                         with analysis_col1:
                             st.markdown("### Graph Analysis")
-                            if graph.number_of_nodes() > 0:
-                                density = nx.density(graph)
-                                components = nx.number_connected_components(graph.to_undirected())
+                            if stats["nodes"] > 0:
                                 st.markdown(f"""
-                                - **Graph Density:** {density:.4f}
-                                - **Connected Components:** {components}
+                                - **Graph Density:** {stats["density"]:.4f}
+                                - **Connected Components:** {stats["components"]}
                                 """)
                         
                         with analysis_col2:
                             st.markdown("### Most Connected Nodes")
-                            if graph.number_of_nodes() > 0:
-                                # Create table for top nodes
-                                degrees = dict(graph.degree())
-                                top_nodes = sorted(degrees.items(), key=lambda x: x[1], reverse=True)[:5]
-                                
+                            if stats["nodes"] > 0:
                                 # Display top nodes in a DataFrame
                                 top_nodes_data = []
-                                for node, degree in top_nodes:
-                                    sha_hash = xxhash.xxh64(node.encode()).hexdigest()[:12]
+                                for node, degree in stats["top_nodes"]:
+                                    sha_hash = xxhash.xxh64(node.encode()).hexdigest()[:12] if xxhash else ""
                                     top_nodes_data.append({
                                         "Node": node,
                                         "Hash": sha_hash,
@@ -612,47 +1113,62 @@ def show_search():
                         st.markdown("### Interactive Graph Visualization")
                         
                         try:
-                            import random
+                            # The saved page doubles as an on-disk cache; rebuild it only
+                            # when the graph has been re-indexed since it was written
+                            html_path = os.path.join(store_path, "graph_visualization.html")
+                            if not os.path.exists(html_path) or os.path.getmtime(html_path) < graph_mtime:
+                                import random
 
-                            from pyvis.network import Network
-                            
-                            with st.spinner("Generating interactive network visualization..."):
-                                net = Network(
-                                    height="600px", 
-                                    width="100%", 
-                                    bgcolor="#ffffff",
-                                    font_color="#333333",
-                                    directed=True
-                                )
-                                
-                                net.from_nx(graph)
-                                
-                                for node in net.nodes:
-                                    node.update({
-                                        "color": "#{:06x}".format(random.randint(0, 0xFFFFFF)),
-                                        "size": 25,
-                                        "font": {"size": 12},
-                                        "borderWidth": 2,
-                                        "borderWidthSelected": 4
-                                    })
+                                import networkx as nx
+                                from pyvis.network import Network
                                 
-                                html_path = os.path.join(store_path, "graph_visualization.html")
-                                net.save_graph(html_path)
+                                # Parsed only to rebuild the page and dropped with this run
+                                graph = nx.read_graphml(graph_path)
                                 
-                                with open(html_path, 'r', encoding='utf-8') as f:
-                                    html_content = f.read()
-                                    html_content = html_content.replace(
-                                        '</head>',
-                                        '''<style>
-                                        .vis-network {
-                                            border: 1px solid #ddd;
-                                            border-radius: 4px;
-                                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                                        }
-                                        </style>
-                                        </head>'''
+                                with st.spinner("Generating interactive network visualization..."):
+                                    net = Network(
+                                        height="600px", 
+                                        width="100%", 
+                                        bgcolor="#ffffff",
+                                        font_color="#333333",
+                                        directed=True
                                     )
-                                st.components.v1.html(html_content, height=600)
+                                    
+                                    # Project to the fields the view uses; descriptions and source ids
+                                    # would only bloat the generated HTML, vis.js never shows them
+                                    projected = graph.__class__()
+                                    projected.add_nodes_from(graph.nodes)
+                                    projected.add_edges_from(
+                                        (u, v, {"weight": weight})
+                                        for u, v, weight in graph.edges(data="weight", default=1)
+                                    )
+                                    net.from_nx(projected)
+                                    
+                                    for node in net.nodes:
+                                        node.update({
+                                            "color": "#{:06x}".format(random.randint(0, 0xFFFFFF)),
+                                            "size": 25,
+                                            "font": {"size": 12},
+                                            "borderWidth": 2,
+                                            "borderWidthSelected": 4
+                                        })
+                                    
+                                    net.save_graph(html_path)
+                            
+                            with open(html_path, 'r', encoding='utf-8') as f:
+                                html_content = f.read()
+                                html_content = html_content.replace(
+                                    '</head>',
+                                    '''<style>
+                                    .vis-network {
+                                        border: 1px solid #ddd;
+                                        border-radius: 4px;
+                                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                                    }
+                                    </style>
+                                    </head>'''
+                                )
+                            st.components.v1.html(html_content, height=600)
                         
                         except ImportError:
                             st.error("⚠️ Please install pyvis to enable graph visualization: `pip install pyvis`")
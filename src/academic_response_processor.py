@@ -14,6 +14,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled once at import instead of being looked up on every response
+BRACKET_CITATION_PATTERN = re.compile(r'\[([^\]]+)\]')
+PAREN_CITATION_PATTERN = re.compile(r'\(([^)]+?)\s*\d{4}\)')
+EQUATION_OPEN_PATTERN = re.compile(r'(?<!\n)\$\$')
+EQUATION_CLOSE_PATTERN = re.compile(r'\$\$(?!\n)')
+
 class AcademicResponseProcessor:
     """Enhanced processor for academic responses with reference management"""
 
@@ -43,8 +49,8 @@ class AcademicResponseProcessor:
                 return match.group(0)
             
             # Replace citations
-            text = re.sub(r'\[([^\]]+)\]', replace_citation, text)
-            text = re.sub(r'\(([^)]+?)\s*\d{4}\)', replace_citation, text)
+            text = BRACKET_CITATION_PATTERN.sub(replace_citation, text)
+            text = PAREN_CITATION_PATTERN.sub(replace_citation, text)
             
             return text
             
@@ -56,8 +62,8 @@ class AcademicResponseProcessor:
         """Format mathematical equations in text"""
         try:
             # Ensure equations are properly formatted with newlines
-            text = re.sub(r'(?<!\n)\$\$', '\n$$', text)
-            text = re.sub(r'\$\$(?!\n)', '$$\n', text)
+            text = EQUATION_OPEN_PATTERN.sub('\n$$', text)
+            text = EQUATION_CLOSE_PATTERN.sub('$$\n', text)
             return text
         except Exception as e:
             logger.error(f"Error formatting equations: {str(e)}")
@@ -1,5 +1,8 @@
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple, Any
 
 import pandas as pd
@@ -183,3 +186,45 @@ class ResponseProcessor:
         except Exception as e:
             logger.error(f"Error extracting key points: {e}")
             return []
+
+
+class AnswerCache:
+    """Thread-safe LRU store of completed answers that expire after a fixed time"""
+
+    def __init__(self, max_entries: int = 64, ttl: float = 600.0):
+        """Initialize the cache
+
+        Args:
+            max_entries: Maximum number of answers kept; the least recently used go first
+            ttl: Seconds an answer stays valid after it is stored
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Return the stored answer for key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, answer = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return answer
+
+    def set(self, key: tuple, answer: str) -> None:
+        """Store an answer, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every stored answer"""
+        with self._lock:
+            self._entries.clear()
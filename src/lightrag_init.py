@@ -1,11 +1,17 @@
 import logging
 import os
-from typing import Optional, Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, AsyncIterator, List
 from datetime import datetime
 
+import numpy as np
 from lightrag import LightRAG, QueryParam
-from lightrag.llm import gpt_4o_complete, gpt_4o_mini_complete, openai_embedding
-from lightrag.utils import EmbeddingFunc
+from lightrag.utils import EmbeddingFunc, safe_unicode_decode
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 from termcolor import colored
 from src.document_validator import DocumentValidator
 from src.academic_response_processor import AcademicResponseProcessor
@@ -17,8 +23,19 @@ DEFAULT_MODEL = "gpt-4o-mini"
 SUPPORTED_MODELS = ["gpt-4o-mini", "gpt-4o", "o1-mini", "o1"]
 DEFAULT_CHUNK_SIZE = 500
 DEFAULT_CHUNK_OVERLAP = 50
+DEFAULT_EMBEDDING_BATCH_SIZE = 32  # Chunks sent per embeddings API call
+DEFAULT_LLM_MAX_ASYNC = 16  # Concurrent LLM calls during extraction and keyword/map steps
 SUPPORTED_MODES = ["naive", "local", "global", "hybrid", "mix"]
+# Query options forwarded to LightRAG's QueryParam when passed as kwargs
+QUERY_PARAM_KEYS = (
+    "top_k",
+    "max_token_for_text_unit",
+    "max_token_for_global_context",
+    "max_token_for_local_context",
+    "response_type",
+)
 MAX_WORKERS = 4  # Maximum number of parallel workers for file processing
+EMBEDDING_MODEL = "text-embedding-3-small"
 
 # Configure logging
 logging.basicConfig(
@@ -28,24 +45,98 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@dataclass(frozen=True)
+class LLMSettings:
+    """OpenAI settings of the session making a request
+
+    One manager serves every session using a store, so the key, model and
+    temperature travel with each query or indexing run instead.
+    """
+    api_key: str
+    model_name: str = DEFAULT_MODEL
+    temperature: float = 0.0
+
+
+# Settings of the request currently running; LightRAG's internal tasks inherit it
+_llm_settings: ContextVar[LLMSettings] = ContextVar("llm_settings")
+
+# Retry transient OpenAI failures the way LightRAG's own OpenAI functions do
+_openai_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=4, max=10),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, APITimeoutError)),
+)
+
+
+@_openai_retry
+async def _openai_complete(prompt, system_prompt=None, history_messages=[], **kwargs):
+    """LightRAG LLM function that uses the calling request's key, model and temperature
+
+    LightRAG's bundled OpenAI functions read the key from os.environ, which is
+    shared by every session in the process, so the client is built explicitly.
+    """
+    settings = _llm_settings.get()
+    # Only gpt-4o has its own LightRAG setup; other models use gpt-4o-mini as before
+    model = "gpt-4o" if settings.model_name == "gpt-4o" else "gpt-4o-mini"
+    kwargs.pop("hashing_kv", None)
+    kwargs.pop("keyword_extraction", None)
+    kwargs.setdefault("temperature", settings.temperature)
+
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history_messages)
+    messages.append({"role": "user", "content": prompt})
+
+    client = AsyncOpenAI(api_key=settings.api_key)
+    response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+
+    if hasattr(response, "__aiter__"):
+        async def stream():
+            async for chunk in response:
+                content = chunk.choices[0].delta.content
+                if content is None:
+                    continue
+                yield safe_unicode_decode(content.encode("utf-8")) if r"\u" in content else content
+        return stream()
+
+    content = response.choices[0].message.content
+    return safe_unicode_decode(content.encode("utf-8")) if r"\u" in content else content
+
+
+@_openai_retry
+async def _openai_embed(texts: List[str]) -> np.ndarray:
+    """LightRAG embedding function that uses the calling request's key"""
+    client = AsyncOpenAI(api_key=_llm_settings.get().api_key)
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts, encoding_format="float")
+    return np.array([item.embedding for item in response.data])
+
+
 class LightRAGManager:
-    """Manager class for LightRAG initialization and configuration"""
+    """Manager class for LightRAG initialization and configuration
+
+    A manager owns the LightRAG instance for one store. Per-session settings
+    (API key, model, temperature) are passed with each call as LLMSettings.
+    """
 
     def __init__(
         self,
-        api_key: str,
         input_dir: str,
-        model_name: str = DEFAULT_MODEL,
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
-        temperature: float = 0.0,
-        chunk_strategy: str = "sentence"
+        chunk_strategy: str = "sentence",
+        embedding_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+        llm_max_async: int = DEFAULT_LLM_MAX_ASYNC
     ):
         """Initialize LightRAG with enhanced configuration"""
         print(colored("Initializing LightRAG...", "cyan"))
         
         self.input_dir = input_dir
-        self.model_name = model_name
+        self.embedding_batch_size = embedding_batch_size
+        self.llm_max_async = llm_max_async
+        self._index_lock = threading.Lock()  # One indexing run at a time per manager
+        self._indexed_files: Dict[str, int] = {}  # Path -> mtime_ns when it was indexed
         
         # Initialize configuration
         self.config_manager = ConfigManager(
@@ -60,35 +151,30 @@ class LightRAGManager:
         self.response_processor = AcademicResponseProcessor()
         
         # Configure LightRAG
-        self._configure_rag(api_key, temperature)
+        self._configure_rag()
         logger.info("LightRAG manager initialized successfully")
 
-    def _configure_rag(self, api_key: str, temperature: float) -> None:
+    def _configure_rag(self) -> None:
         """Configure LightRAG with model and embedding settings"""
-        os.environ["OPENAI_API_KEY"] = api_key
-        
-        # Select model function based on model name
-        if self.model_name == "gpt-4o":
-            llm_func = gpt_4o_complete
-        else:
-            llm_func = gpt_4o_mini_complete
-            
-        # Initialize RAG with configuration
+        # The OpenAI functions pick up each request's LLMSettings, so one
+        # instance serves every session regardless of key, model or temperature
         self.rag = LightRAG(
             working_dir=self.input_dir,
-            llm_model_func=llm_func,
+            llm_model_func=_openai_complete,
             embedding_func=EmbeddingFunc(
                 embedding_dim=1536,  # OpenAI embedding dimension
                 max_token_size=8192,
-                func=openai_embedding
-            )
+                func=_openai_embed
+            ),
+            # Number of chunks embedded per openai_embedding call
+            embedding_batch_num=self.embedding_batch_size,
+            # LightRAG caps in-flight LLM calls with this limit
+            llm_model_max_async=self.llm_max_async
         )
-        
-        # Store temperature for use in queries
-        self.temperature = temperature
 
-    def load_documents(self, file_paths: Optional[List[str]] = None) -> None:
+    def load_documents(self, file_paths: Optional[List[str]] = None, *, settings: LLMSettings) -> None:
         """Load and index documents following LightRAG's documentation"""
+        token = _llm_settings.set(settings)
         try:
             print(colored("\nIndexing documents...", "cyan"))
             
@@ -112,115 +198,213 @@ class LightRAGManager:
             if not file_paths:
                 raise Exception("No valid documents found to load")
             
-            # Process and index documents
+            # Read and validate documents, then index them in one batch
             total = len(file_paths)
             print(colored(f"\nProcessing and indexing {total} documents...", "cyan"))
             
-            for idx, file_path in enumerate(file_paths, 1):
-                try:
-                    # Read and validate content
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    is_valid, error = self.validator.validate_content(content)
-                    if not is_valid:
-                        logger.warning(f"Skipping {file_path}: {error}")
-                        continue
-                    
-                    # Add source information
-                    file_info = f"[Source: {os.path.basename(file_path)}]\n\n"
-                    content_with_source = file_info + content
-                    
-                    # Insert into LightRAG with progress indicator
-                    print(f"\rProcessing document {idx}/{total}: {os.path.basename(file_path)}", end='')
-                    self.rag.insert(content_with_source)
-                    
-                except Exception as e:
-                    print(colored(f"\n✗ Error processing {file_path}: {str(e)}", "red"))
-                    logger.error(f"Error processing {file_path}: {str(e)}")
-                    continue
+            # File reads are independent and I/O-bound, so overlap them; map keeps input order
+            contents = []
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for idx, (file_path, content) in enumerate(
+                    zip(file_paths, executor.map(self._read_document, file_paths)), 1
+                ):
+                    if content is not None:
+                        contents.append(content)
+                        print(f"\rPrepared document {idx}/{total}: {os.path.basename(file_path)}", end='')
+            
+            if not contents:
+                raise Exception("No valid document content found to index")
+            
+            # A single insert lets LightRAG chunk every document first and embed
+            # the chunks in batches of embedding_batch_size, instead of per document
+            self.rag.insert(contents)
             
             print(colored("\n\nIndexing complete! ✓", "green"))
-            print(f"Successfully processed and indexed {total} files")
+            print(f"Successfully processed and indexed {len(contents)} of {total} files")
                     
         except Exception as e:
             logger.error(f"Error loading documents: {str(e)}")
             print(colored(f"\nError loading documents: {str(e)}", "red"))
             raise
+        finally:
+            _llm_settings.reset(token)
+
+    def load_new_documents(self, file_paths: List[str], *, settings: LLMSettings) -> None:
+        """Index only files that are new or changed since this manager last indexed them
+
+        Managers are shared across sessions; the lock keeps two sessions from
+        running rag.insert against the same storage at the same time.
+        """
+        with self._index_lock:
+            versions = {path: os.stat(path).st_mtime_ns for path in file_paths}
+            pending = [path for path, version in versions.items() if self._indexed_files.get(path) != version]
+            if not pending:
+                logger.info("All documents already indexed")
+                return
+            
+            self.load_documents(pending, settings=settings)
+            self._indexed_files.update((path, versions[path]) for path in pending)
+
+    def _read_document(self, file_path: str) -> Optional[str]:
+        """Read and validate one document, returning its content tagged with the source name"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            is_valid, error = self.validator.validate_content(content)
+            if not is_valid:
+                logger.warning(f"Skipping {file_path}: {error}")
+                return None
+            
+            # Add source information
+            file_info = f"[Source: {os.path.basename(file_path)}]\n\n"
+            return file_info + content
+            
+        except Exception as e:
+            print(colored(f"\n✗ Error processing {file_path}: {str(e)}", "red"))
+            logger.error(f"Error processing {file_path}: {str(e)}")
+            return None
+
+    def _build_query_param(
+        self,
+        mode: str,
+        only_context: bool = False,
+        stream: bool = False,
+        **kwargs
+    ) -> QueryParam:
+        """Validate the search mode and return fresh LightRAG query parameters
+
+        LightRAG rewrites QueryParam.mode in place while querying, so every query
+        gets its own instance.
+        """
+        # Convert mode to lowercase first
+        mode = str(mode).lower()
+        
+        # Then check if it's supported
+        if mode not in SUPPORTED_MODES:
+            raise ValueError(f"Unsupported mode: {mode}. Use one of {SUPPORTED_MODES}")
+        
+        # Add any additional kwargs that match QueryParam's parameters
+        param_kwargs = {key: kwargs[key] for key in QUERY_PARAM_KEYS if key in kwargs}
+        
+        # Create query parameters
+        return QueryParam(
+            mode=mode,
+            only_need_context=only_context,
+            stream=stream,
+            **param_kwargs
+        )
+
+    def _package_response(
+        self,
+        response: str,
+        mode: str,
+        only_context: bool,
+        settings: LLMSettings
+    ) -> Dict[str, Any]:
+        """Apply academic formatting and wrap the response in our standard format"""
+        # Process response for academic formatting if needed
+        if not only_context:
+            response = self.response_processor.process_response(response)
+        
+        # Return response in our standard format
+        return {
+            "response": response,
+            "mode": mode,
+            "timestamp": datetime.now().isoformat(),
+            "model": settings.model_name,
+            "temperature": settings.temperature
+        }
 
     def query(
         self,
         query: str,
         mode: str = "hybrid",
         only_context: bool = False,
-        temperature: Optional[float] = None,
+        *,
+        settings: LLMSettings,
         **kwargs
     ) -> Dict[str, Any]:
         """Enhanced query processing with academic formatting"""
+        token = _llm_settings.set(settings)
         try:
-            # Convert mode to lowercase first
-            mode = str(mode).lower()
-            
-            # Then check if it's supported
-            if mode not in SUPPORTED_MODES:
-                raise ValueError(f"Unsupported mode: {mode}. Use one of {SUPPORTED_MODES}")
-            
-            # Create query parameters according to LightRAG's QueryParam spec
-            param_kwargs = {}
-            
-            # Handle temperature setting through llm_model_kwargs
-            if temperature is not None:
-                param_kwargs["llm_model_kwargs"] = {"temperature": temperature}
-            elif self.temperature != 0.0:
-                param_kwargs["llm_model_kwargs"] = {"temperature": self.temperature}
-            
-            # Add any additional kwargs that match QueryParam's parameters
-            valid_param_keys = [
-                "top_k", 
-                "max_token_for_text_unit",
-                "max_token_for_global_context", 
-                "max_token_for_local_context",
-                "response_type"
-            ]
-            for key in valid_param_keys:
-                if key in kwargs:
-                    param_kwargs[key] = kwargs[key]
-            
-            # Create query parameters
-            param = QueryParam(
-                mode=mode,
-                only_need_context=only_context,
-                **param_kwargs
-            )
+            param = self._build_query_param(mode, only_context, **kwargs)
+            # LightRAG may rewrite param.mode (e.g. mix -> hybrid); report the requested one
+            mode = param.mode
             
             # Process query - LightRAG returns a string
             response = self.rag.query(query, param=param)
             
-            # Process response for academic formatting if needed
-            if not only_context:
-                response = self.response_processor.process_response(response)
+            return self._package_response(response, mode, only_context, settings)
             
-            # Return response in our standard format
-            return {
-                "response": response,
-                "mode": mode,
-                "timestamp": datetime.now().isoformat(),
-                "model": self.model_name,
-                "temperature": temperature if temperature is not None else self.temperature
-            }
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            print(colored(f"Error processing query: {str(e)}", "red"))
+            raise
+        finally:
+            _llm_settings.reset(token)
+
+    async def aquery(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        only_context: bool = False,
+        *,
+        settings: LLMSettings,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Async variant of query() for callers already running inside an event loop"""
+        # Set for this task only; LightRAG's subtasks copy it when they are created
+        _llm_settings.set(settings)
+        try:
+            param = self._build_query_param(mode, only_context, **kwargs)
+            # LightRAG may rewrite param.mode (e.g. mix -> hybrid); report the requested one
+            mode = param.mode
+            
+            # Await LightRAG directly; its sync query() would try to drive the running loop
+            response = await self.rag.aquery(query, param=param)
+            
+            return self._package_response(response, mode, only_context, settings)
             
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             print(colored(f"Error processing query: {str(e)}", "red"))
             raise
 
+    async def astream(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        *,
+        settings: LLMSettings,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream the raw LightRAG response in chunks as the LLM produces them"""
+        # The LLM request is made while awaiting aquery below; later steps only
+        # read the open stream, so the settings need not outlive this step
+        _llm_settings.set(settings)
+        try:
+            param = self._build_query_param(mode, False, stream=True, **kwargs)
+            response = await self.rag.aquery(query, param=param)
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            print(colored(f"Error processing query: {str(e)}", "red"))
+            raise
+        
+        # Cached answers and fallbacks come back as a plain string
+        if isinstance(response, str):
+            yield response
+            return
+        
+        async for chunk in response:
+            yield chunk
+
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the loaded documents and index"""
         try:
             return {
                 "total_documents": len(self.file_processor.metadata["files"]),
                 "last_updated": self.file_processor.metadata["last_updated"],
-                "model": self.model_name,
                 "chunk_config": self.config_manager.get_config().__dict__,
                 "store_size": self._get_store_size()
             }
@@ -0,0 +1,39 @@
+"""Tests for the shared answer cache."""
+import time
+
+from src.lightrag_helpers import AnswerCache
+
+
+def test_answer_cache_get_and_set():
+    cache = AnswerCache()
+    key = ("query", "mix", "store", "gpt-4o-mini")
+    assert cache.get(key) is None
+
+    cache.set(key, "answer")
+    assert cache.get(key) == "answer"
+
+
+def test_answer_cache_evicts_least_recently_used():
+    cache = AnswerCache(max_entries=2)
+    cache.set(("a",), "1")
+    cache.set(("b",), "2")
+    cache.get(("a",))  # "b" is now the least recently used
+    cache.set(("c",), "3")
+
+    assert cache.get(("a",)) == "1"
+    assert cache.get(("b",)) is None
+    assert cache.get(("c",)) == "3"
+
+
+def test_answer_cache_expires_entries():
+    cache = AnswerCache(ttl=0.05)
+    cache.set(("a",), "1")
+    time.sleep(0.1)
+    assert cache.get(("a",)) is None
+
+
+def test_answer_cache_clear():
+    cache = AnswerCache()
+    cache.set(("a",), "1")
+    cache.clear()
+    assert cache.get(("a",)) is None
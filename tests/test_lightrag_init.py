@@ -0,0 +1,142 @@
+"""Tests for LightRAGManager querying."""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src import lightrag_init
+from src.lightrag_init import LightRAGManager, LLMSettings
+
+SETTINGS = LLMSettings(api_key="test-key")
+
+
+class FakeLightRAG:
+    """Stands in for LightRAG; records query parameters and returns a preset response"""
+
+    def __init__(self, **kwargs):
+        self.config = kwargs
+        self.response = "answer"
+        self.params = []
+
+    async def aquery(self, query, param):
+        self.params.append(param)
+        return self.response
+
+
+class FakeAsyncOpenAI:
+    """Stands in for AsyncOpenAI; records the key and request it was given"""
+    created = []
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        FakeAsyncOpenAI.created.append((self.api_key, kwargs))
+        message = SimpleNamespace(content="reply")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+async def _chunks(*chunks):
+    """Async iterator shaped like a streaming LLM response"""
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(agen) -> list:
+    """Drain an async generator from synchronous test code"""
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    """A manager backed by FakeLightRAG instead of a real index"""
+    monkeypatch.setattr("src.lightrag_init.LightRAG", FakeLightRAG)
+    return LightRAGManager(input_dir=str(tmp_path))
+
+
+def test_astream_yields_streamed_chunks(manager):
+    manager.rag.response = _chunks("Hel", "lo", "!")
+
+    assert collect(manager.astream("question", mode="mix", settings=SETTINGS)) == ["Hel", "lo", "!"]
+    assert manager.rag.params[-1].stream
+
+
+def test_astream_yields_plain_string_once(manager):
+    """Cached answers and fallbacks come back from LightRAG as a plain string"""
+    manager.rag.response = "cached answer"
+
+    assert collect(manager.astream("question", settings=SETTINGS)) == ["cached answer"]
+
+
+def test_query_param_is_fresh_per_call(manager):
+    """LightRAG rewrites QueryParam.mode while querying; later calls must not see it"""
+    first = manager._build_query_param("mix")
+    first.mode = "hybrid"
+
+    second = manager._build_query_param("mix")
+    assert second is not first
+    assert second.mode == "mix"
+
+
+def test_query_param_forwards_known_options_only(manager):
+    param = manager._build_query_param("Hybrid", top_k=10, not_an_option=1)
+
+    assert param.mode == "hybrid"
+    assert param.top_k == 10
+    assert not hasattr(param, "not_an_option")
+
+
+def test_query_param_rejects_unsupported_mode(manager):
+    with pytest.raises(ValueError):
+        manager._build_query_param("bogus")
+
+
+def test_query_reports_requested_mode(manager):
+    """LightRAG may narrow mix to hybrid in place; the response keeps the requested mode"""
+    async def rewriting_aquery(query, param):
+        param.mode = "hybrid"
+        return "context"
+    manager.rag.aquery = rewriting_aquery
+
+    result = asyncio.run(manager.aquery("question", mode="mix", only_context=True, settings=SETTINGS))
+    assert result["mode"] == "mix"
+
+
+def test_llm_uses_each_requests_settings(monkeypatch):
+    """Sessions share one LightRAG; key, model and temperature come from the request"""
+    monkeypatch.setattr("src.lightrag_init.AsyncOpenAI", FakeAsyncOpenAI)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    FakeAsyncOpenAI.created.clear()
+
+    async def ask(settings):
+        lightrag_init._llm_settings.set(settings)
+        return await lightrag_init._openai_complete("question", hashing_kv=None)
+
+    asyncio.run(ask(LLMSettings(api_key="key-a", model_name="gpt-4o", temperature=0.7)))
+    asyncio.run(ask(LLMSettings(api_key="key-b")))
+
+    (key_a, request_a), (key_b, request_b) = FakeAsyncOpenAI.created
+    assert (key_a, request_a["model"], request_a["temperature"]) == ("key-a", "gpt-4o", 0.7)
+    assert (key_b, request_b["model"], request_b["temperature"]) == ("key-b", "gpt-4o-mini", 0.0)
+    assert "hashing_kv" not in request_a
+    assert "OPENAI_API_KEY" not in os.environ
+
+
+def test_load_new_documents_indexes_each_version_once(manager, tmp_path, monkeypatch):
+    indexed = []
+    monkeypatch.setattr(manager, "load_documents", lambda paths, settings: indexed.append(paths))
+    document = tmp_path / "paper.txt"
+    document.write_text("text")
+
+    manager.load_new_documents([str(document)], settings=SETTINGS)
+    manager.load_new_documents([str(document)], settings=SETTINGS)
+    assert indexed == [[str(document)]]
+
+    stat = document.stat()
+    os.utime(document, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    manager.load_new_documents([str(document)], settings=SETTINGS)
+    assert indexed == [[str(document)]] * 2
@@ -0,0 +1,173 @@
+"""Tests for the pure helpers behind the Streamlit pages."""
+import time
+
+import pytest
+
+from src.academic_metadata import AcademicMetadata
+from src.base_metadata import Reference
+from pages.Academic import create_citation_network
+from pages.Manage import _scan_store
+from pages.Search import (
+    build_conversation_context,
+    estimate_tokens,
+    format_response,
+    iterate_async,
+    make_exchange,
+)
+
+HEADER = "Previous conversation:\n"
+
+
+def test_iterate_async_yields_items_in_order():
+    async def numbers():
+        for number in range(3):
+            yield number
+
+    assert list(iterate_async(numbers())) == [0, 1, 2]
+
+
+def test_iterate_async_closes_abandoned_stream():
+    """A rerun can drop the stream midway; the async generator must still be closed"""
+    closed = []
+
+    async def stream():
+        try:
+            for chunk in ("a", "b", "c"):
+                yield chunk
+        finally:
+            closed.append(True)
+
+    items = iterate_async(stream())
+    assert next(items) == "a"
+    items.close()
+
+    # aclose is scheduled on the event loop thread without waiting for it
+    deadline = time.monotonic() + 1.0
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert closed
+
+
+def test_estimate_tokens_uses_four_characters_per_token():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 40) == 10
+
+
+def test_conversation_context_keeps_newest_exchanges_in_budget():
+    exchanges = [{"text": f"{i}" * 40, "tokens": 10} for i in range(3)]
+
+    context = build_conversation_context(exchanges, "", estimate_tokens(HEADER) + 20)
+    assert context == HEADER + "1" * 40 + "2" * 40
+
+
+def test_conversation_context_counts_summary_against_budget():
+    summary_part = "Summary of earlier conversation: earlier\n\n"
+    exchanges = [{"text": "x" * 40, "tokens": 10}]
+    budget = estimate_tokens(HEADER) + estimate_tokens(summary_part)
+
+    assert build_conversation_context(exchanges, "earlier", budget) == HEADER + summary_part
+
+
+def test_conversation_memory_survives_a_chat_past_the_budget():
+    """Each query carries the earlier conversation; stored exchanges must not"""
+    exchanges, budget = [], 200
+    for turn in range(20):
+        prompt = f"question {turn}"
+        context = build_conversation_context(exchanges, "", budget)
+        query = f"{context}\nCurrent query: {prompt}" if exchanges else prompt
+        assert estimate_tokens(context) <= budget
+        exchanges.append(make_exchange(prompt, f"answer {turn}"))
+
+    context = build_conversation_context(exchanges, "", budget)
+    assert "User: question 19\nAssistant: answer 19" in context
+    assert "User: question 18\nAssistant: answer 18" in context
+    assert context.count("Previous conversation") == 1
+    assert all(exchange["query"] == f"question {turn}" for turn, exchange in enumerate(exchanges))
+    assert query.endswith("Current query: question 19")
+
+
+def test_format_response_adds_sources_only_when_present():
+    assert format_response("answer") == "answer"
+    assert format_response("answer", ("a.pdf", "b.pdf")) == "answer\n\n*Sources:*\n- a.pdf\n- b.pdf"
+
+
+@pytest.fixture
+def metadata_list():
+    """Two papers citing one shared work (matched by DOI) and one work each"""
+    return [
+        AcademicMetadata(
+            doc_id="paper1",
+            title="Paper One",
+            references=[
+                Reference(raw_text="Shared", title="Shared Work", year=2020, doi="10.1/shared"),
+                Reference(raw_text="Only one", title="Only One", year=2019),
+            ],
+        ),
+        AcademicMetadata(
+            doc_id="paper2",
+            title="Paper Two",
+            references=[
+                Reference(raw_text="Shared", title="Shared work (preprint)", year=2020, doi="10.1/shared"),
+                Reference(raw_text="Only two", title="Only Two", year=2018),
+            ],
+        ),
+    ]
+
+
+def test_citation_network_merges_references_by_doi(metadata_list):
+    net = create_citation_network(metadata_list)
+
+    assert set(net.get_nodes()) == {"paper1", "paper2", "10.1/shared", "Only One_2019", "Only Two_2018"}
+    assert len(net.edges) == 4
+
+
+def test_citation_network_ships_a_static_layout(metadata_list):
+    """Positions are computed on the server so the browser needn't simulate physics"""
+    net = create_citation_network(metadata_list)
+    assert all("x" in node and "y" in node for node in net.nodes)
+
+
+def test_citation_network_prunes_rarely_cited_references(metadata_list):
+    net = create_citation_network(metadata_list, min_citations=2)
+
+    assert set(net.get_nodes()) == {"paper1", "paper2", "10.1/shared"}
+    assert {(edge["from"], edge["to"]) for edge in net.edges} == {
+        ("paper1", "10.1/shared"),
+        ("paper2", "10.1/shared"),
+    }
+
+
+def test_citation_network_physics_mode_leaves_layout_to_browser(metadata_list):
+    net = create_citation_network(metadata_list, physics=True)
+
+    assert not any("x" in node for node in net.nodes)
+    assert net.options["physics"]["solver"] == "barnesHut"
+
+
+def test_scan_store_rows(tmp_path):
+    for name in ["a.pdf", "a.txt", "b.pdf", "notes.txt", "broken.txt", "vdb_chunks.json"]:
+        (tmp_path / name).write_text("content")
+    (tmp_path / "a_metadata.json").write_text('{"doc_id": "a", "references": [{"raw_text": "ref"}]}')
+    (tmp_path / "broken_metadata.json").write_text("not json")
+
+    rows = {row["name"]: row for row in _scan_store(str(tmp_path), 0)}
+
+    assert set(rows) == {"a.pdf", "b.pdf", "a.txt", "notes.txt", "broken.txt"}
+    assert rows["a.pdf"]["status"] == "Processed"
+    assert rows["a.pdf"]["academic"] == "📚 1 refs, 0 eqs"
+    assert rows["b.pdf"]["status"] == "Pending"
+    assert rows["b.pdf"]["academic"] == ""
+    assert rows["a.txt"]["status"] == "Source"
+    assert rows["notes.txt"]["status"] == "Standalone"
+    assert rows["broken.txt"]["academic"] == "❌ Metadata error"
+
+
+def test_scan_store_rows_are_cached_until_the_directory_changes(tmp_path):
+    (tmp_path / "a.pdf").write_text("content")
+    _scan_store.clear()
+    assert [row["name"] for row in _scan_store(str(tmp_path), 1)] == ["a.pdf"]
+
+    (tmp_path / "b.pdf").write_text("content")
+    # Same directory mtime: the cached rows are served without rescanning
+    assert [row["name"] for row in _scan_store(str(tmp_path), 1)] == ["a.pdf"]
+    assert {row["name"] for row in _scan_store(str(tmp_path), 2)} == {"a.pdf", "b.pdf"}